@@ -1,36 +1,80 @@
 """Web 管理界面认证模块"""
 
+import asyncio
+import base64
 import hashlib
 import hmac
-import json
 import os
 import secrets
+import threading
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from pydantic import BaseModel
+from .. import fastjson
 
-# PBKDF2 哈希参数
+# scrypt 哈希参数（新密码统一使用，内存困难型 KDF）
+_SCRYPT_N = 2 ** 14
+_SCRYPT_R = 8
+_SCRYPT_P = 1
+_SCRYPT_DKLEN = 32
+_HASH_PREFIX = "scrypt:"  # 当前格式前缀，用于区分新旧格式
+
+# PBKDF2-HMAC-SHA512 参数（OpenSSL 不支持 scrypt 时的回退方案）
+# SHA-512 以 64 位字为单位运算，在 64 位 CPU 上吞吐高于 SHA-256
+_PBKDF2_SHA512_ITERATIONS = 210000  # OWASP 推荐值
+_PBKDF2_SHA512_DKLEN = 64
+_PBKDF2_SHA512_PREFIX = "pbkdf2-sha512:"
+
+# 旧版 PBKDF2-HMAC-SHA256 哈希参数（仅用于校验，登录成功后自动升级）
 _PBKDF2_ITERATIONS = 260000  # OWASP 2023 推荐值
 _PBKDF2_HASH = "sha256"
-_HASH_PREFIX = "pbkdf2:"  # 用于区分新旧格式
+_PBKDF2_PREFIX = "pbkdf2:"
+
+# hashlib.scrypt 依赖 OpenSSL 1.1+，部分构建中不可用
+_HAS_SCRYPT = hasattr(hashlib, "scrypt")
+_CURRENT_PREFIX = _HASH_PREFIX if _HAS_SCRYPT else _PBKDF2_SHA512_PREFIX
+
+# 密码校验结果缓存：同一凭据短时间内重复登录时跳过 KDF 计算
+# key 为 HMAC-SHA256(secret, password|stored_hash)，不保存明文密码
+_PW_CACHE_MAXSIZE = 1024
+_PW_CACHE_TTL = 30  # 秒
+_pw_cache: dict[bytes, tuple[float, bool]] = {}
+_pw_cache_lock = threading.Lock()
+
+# 访问令牌有效期（秒）
+_TOKEN_TTL_SECONDS = 24 * 60 * 60
 
+# 仅更新 last_login 时的延迟写盘间隔（秒），合并高频登录产生的写入
+_SAVE_DEBOUNCE_SECONDS = 5.0
 
-class AdminUser(BaseModel):
-    """管理员用户"""
+# 密码哈希线程池：hashlib 在 C 层计算时释放 GIL，避免阻塞 asyncio 事件循环。
+# scrypt 每次约占 16 MB 内存，线程数取小常量，限制并发登录请求的内存与 CPU 占用
+_PW_MAX_WORKERS = 2
+_pw_executor = ThreadPoolExecutor(
+    max_workers=min(_PW_MAX_WORKERS, os.cpu_count() or 1),
+    thread_name_prefix="iflow2api-pw",
+)
+
+
+@dataclass(slots=True)
+class AdminUser:
+    """管理员用户（内部可信数据，无需 Pydantic 校验）"""
     username: str
     password_hash: str
     created_at: datetime
     last_login: Optional[datetime] = None
 
 
-class TokenData(BaseModel):
-    """Token 数据"""
+@dataclass(slots=True)
+class TokenData:
+    """Token 数据（exp/iat 为 Unix 时间戳秒数，校验时只做整数比较）"""
     username: str
-    exp: datetime
-    iat: datetime
+    exp: int
+    iat: int
 
 
 class AuthManager:
@@ -39,11 +83,17 @@ class AuthManager:
     def __init__(self):
         self._users: dict[str, AdminUser] = {}
         self._active_tokens: dict[str, TokenData] = {}
+        # 用户名 -> token 集合的反向索引，清除某用户 token 时无需遍历全部
+        self._tokens_by_user: dict[str, set[str]] = {}
+        # 待执行的延迟写盘任务
+        self._save_handle: Optional[asyncio.TimerHandle] = None
         self._config_path = Path.home() / ".iflow2api" / "admin_users.json"
         # JWT secret 单独存储，与用户数据分离
         self._jwt_secret_path = Path.home() / ".iflow2api" / ".jwt_secret"
         self._jwt_secret = self._load_or_create_jwt_secret()
         self._load_users()
+        # 签名密钥只转换一次，避免每次签发/校验重复编码
+        self._jwt_secret_bytes = _signing_key(self._jwt_secret)
 
     def _load_or_create_jwt_secret(self) -> str:
         """加载或创建 JWT 签名密钥，存储在独立的权限严格文件中"""
@@ -68,31 +118,38 @@ class AuthManager:
         """加载用户数据"""
         if self._config_path.exists():
             try:
-                with open(self._config_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for username, user_data in data.get("users", {}).items():
-                        self._users[username] = AdminUser(
-                            username=username,
-                            password_hash=user_data["password_hash"],
-                            created_at=datetime.fromisoformat(user_data["created_at"]),
-                            last_login=datetime.fromisoformat(user_data["last_login"])
-                            if user_data.get("last_login") else None,
-                        )
-                    # 兼容旧版本：旧版 jwt_secret 存在 users 文件中，迁移到独立文件
-                    if "jwt_secret" in data and not self._jwt_secret_path.exists():
-                        secret = data["jwt_secret"]
-                        self._jwt_secret_path.parent.mkdir(parents=True, exist_ok=True)
-                        self._jwt_secret_path.write_text(secret, encoding="utf-8")
-                        try:
-                            os.chmod(self._jwt_secret_path, 0o600)
-                        except Exception:
-                            pass
-                        self._jwt_secret = secret
+                data = fastjson.loads(self._config_path.read_bytes())
+                for username, user_data in data.get("users", {}).items():
+                    self._users[username] = AdminUser(
+                        username=username,
+                        password_hash=user_data["password_hash"],
+                        created_at=datetime.fromisoformat(user_data["created_at"]),
+                        last_login=datetime.fromisoformat(user_data["last_login"])
+                        if user_data.get("last_login") else None,
+                    )
+                # 兼容旧版本：旧版 jwt_secret 存在 users 文件中，迁移到独立文件
+                if "jwt_secret" in data and not self._jwt_secret_path.exists():
+                    secret = data["jwt_secret"]
+                    self._jwt_secret_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._jwt_secret_path.write_text(secret, encoding="utf-8")
+                    try:
+                        os.chmod(self._jwt_secret_path, 0o600)
+                    except Exception:
+                        pass
+                    self._jwt_secret = secret
             except Exception:
                 pass
 
     def _save_users(self) -> None:
-        """保存用户数据（不包含 JWT secret，避免敏感信息共存）"""
+        """保存用户数据（不包含 JWT secret，避免敏感信息共存）
+
+        先写临时文件再 os.replace，避免写入中断导致文件损坏。
+        """
+        if self._save_handle is not None:
+            # 全量写盘已包含待写入的改动
+            self._save_handle.cancel()
+            self._save_handle = None
+
         self._config_path.parent.mkdir(parents=True, exist_ok=True)
         data = {
             "users": {
@@ -105,27 +162,91 @@ class AuthManager:
             }
             # jwt_secret 不再保存在此文件中
         }
-        with open(self._config_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        tmp_path = self._config_path.with_name(self._config_path.name + ".tmp")
+        tmp_path.write_bytes(fastjson.dumps(data, indent=True))
+        os.replace(tmp_path, self._config_path)
+
+    def _schedule_save_users(self) -> None:
+        """延迟保存用户数据，窗口期内的多次改动只写盘一次"""
+        if self._save_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._save_handle = loop.call_later(_SAVE_DEBOUNCE_SECONDS, self._save_users)
+
+    def close(self) -> None:
+        """立即写入尚未落盘的延迟保存（应用关闭时调用）"""
+        if self._save_handle is not None:
+            self._save_users()
 
     @staticmethod
     def _hash_password(password: str) -> str:
-        """哈希密码 - 使用 PBKDF2-HMAC-SHA256 加随机 salt（C-03 修复）
+        """哈希密码 - 使用 scrypt 加随机 salt，不可用时回退到 PBKDF2-HMAC-SHA512
 
-        格式: pbkdf2:{salt_hex}:{hash_hex}
+        格式: scrypt:{n}:{r}:{p}:{salt_hex}:{hash_hex}
+              pbkdf2-sha512:{salt_hex}:{hash_hex}
         """
         salt = secrets.token_bytes(32)
-        dk = hashlib.pbkdf2_hmac(
-            _PBKDF2_HASH,
+        if not _HAS_SCRYPT:
+            dk = hashlib.pbkdf2_hmac(
+                "sha512",
+                password.encode("utf-8"),
+                salt,
+                _PBKDF2_SHA512_ITERATIONS,
+                dklen=_PBKDF2_SHA512_DKLEN,
+            )
+            return f"{_PBKDF2_SHA512_PREFIX}{salt.hex()}:{dk.hex()}"
+
+        dk = hashlib.scrypt(
             password.encode("utf-8"),
-            salt,
-            _PBKDF2_ITERATIONS,
+            salt=salt,
+            n=_SCRYPT_N,
+            r=_SCRYPT_R,
+            p=_SCRYPT_P,
+            dklen=_SCRYPT_DKLEN,
         )
-        return f"{_HASH_PREFIX}{salt.hex()}:{dk.hex()}"
+        return f"{_HASH_PREFIX}{_SCRYPT_N}:{_SCRYPT_R}:{_SCRYPT_P}:{salt.hex()}:{dk.hex()}"
+
+    def _verify_password(self, password: str, stored_hash: str) -> bool:
+        """验证密码，结果按 (password, stored_hash) 短时缓存
+
+        修改密码后 stored_hash 随之变化，旧的缓存条目自然失效。
+
+        Args:
+            password: 明文密码
+            stored_hash: 存储的哈希值
+
+        Returns:
+            密码是否匹配
+        """
+        cache_key = hmac.new(
+            self._jwt_secret_bytes,
+            password.encode("utf-8") + b"|" + stored_hash.encode("utf-8"),
+            "sha256",
+        ).digest()
+        now = time.monotonic()
+        with _pw_cache_lock:
+            cached = _pw_cache.get(cache_key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+        result = self._verify_password_hash(password, stored_hash)
+
+        with _pw_cache_lock:
+            _pw_cache.pop(cache_key, None)
+            while len(_pw_cache) >= _PW_CACHE_MAXSIZE:
+                # dict 保持插入顺序，先淘汰最早写入的条目
+                del _pw_cache[next(iter(_pw_cache))]
+            _pw_cache[cache_key] = (now + _PW_CACHE_TTL, result)
+        return result
+
+    @staticmethod
+    def _needs_rehash(stored_hash: str) -> bool:
+        """检查哈希是否为旧格式，需要在登录成功后升级"""
+        return not stored_hash.startswith(_CURRENT_PREFIX)
 
     @staticmethod
-    def _verify_password(password: str, stored_hash: str) -> bool:
-        """验证密码，兼容旧版 SHA-256 格式（无 salt）和新版 PBKDF2 格式
+    def _verify_password_hash(password: str, stored_hash: str) -> bool:
+        """验证密码，按前缀分派：scrypt、PBKDF2-SHA512、旧版 PBKDF2-SHA256 和裸 SHA-256
 
         Args:
             password: 明文密码
@@ -135,7 +256,39 @@ class AuthManager:
             密码是否匹配
         """
         if stored_hash.startswith(_HASH_PREFIX):
-            # 新格式：pbkdf2:{salt_hex}:{hash_hex}
+            # 新格式：scrypt:{n}:{r}:{p}:{salt_hex}:{hash_hex}
+            try:
+                _, n, r, p, salt_hex, hash_hex = stored_hash.split(":")
+                expected = bytes.fromhex(hash_hex)
+                dk = hashlib.scrypt(
+                    password.encode("utf-8"),
+                    salt=bytes.fromhex(salt_hex),
+                    n=int(n),
+                    r=int(r),
+                    p=int(p),
+                    dklen=len(expected),
+                )
+                # 使用常数时间比较，防止时序攻击（C-04 修复）
+                return hmac.compare_digest(dk, expected)
+            except Exception:
+                return False
+        elif stored_hash.startswith(_PBKDF2_SHA512_PREFIX):
+            # 回退格式：pbkdf2-sha512:{salt_hex}:{hash_hex}
+            try:
+                _, salt_hex, hash_hex = stored_hash.split(":")
+                expected = bytes.fromhex(hash_hex)
+                dk = hashlib.pbkdf2_hmac(
+                    "sha512",
+                    password.encode("utf-8"),
+                    bytes.fromhex(salt_hex),
+                    _PBKDF2_SHA512_ITERATIONS,
+                    dklen=len(expected),
+                )
+                return hmac.compare_digest(dk, expected)
+            except Exception:
+                return False
+        elif stored_hash.startswith(_PBKDF2_PREFIX):
+            # 旧格式：pbkdf2:{salt_hex}:{hash_hex}（登录成功后自动升级）
             try:
                 _, salt_hex, hash_hex = stored_hash.split(":")
                 salt = bytes.fromhex(salt_hex)
@@ -146,7 +299,6 @@ class AuthManager:
                     salt,
                     _PBKDF2_ITERATIONS,
                 )
-                # 使用常数时间比较，防止时序攻击（C-04 修复）
                 return hmac.compare_digest(dk, expected)
             except Exception:
                 return False
@@ -155,102 +307,142 @@ class AuthManager:
             old_hash = hashlib.sha256(password.encode()).hexdigest()
             return hmac.compare_digest(stored_hash, old_hash)
 
-    def create_user(self, username: str, password: str) -> bool:
+    async def create_user(self, username: str, password: str) -> bool:
         """创建用户"""
         if username in self._users:
             return False
-        
+
+        loop = asyncio.get_running_loop()
+        password_hash = await loop.run_in_executor(_pw_executor, self._hash_password, password)
+        # 哈希计算期间可能已有同名用户被创建
+        if username in self._users:
+            return False
+
         user = AdminUser(
             username=username,
-            password_hash=self._hash_password(password),
+            password_hash=password_hash,
             created_at=datetime.now(),
         )
         self._users[username] = user
         self._save_users()
         return True
 
+    def _revoke_user_tokens(self, username: str) -> None:
+        """清除指定用户的所有 token"""
+        for token in self._tokens_by_user.pop(username, ()):
+            self._active_tokens.pop(token, None)
+
+    def _discard_token(self, token: str, username: str) -> None:
+        """从反向索引中移除单个 token"""
+        tokens = self._tokens_by_user.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[username]
+
     def delete_user(self, username: str) -> bool:
         """删除用户"""
-        if username not in self._users:
+        if self._users.pop(username, None) is None:
             return False
-        
-        del self._users[username]
+
         # 清除该用户的所有 token
-        tokens_to_remove = [
-            token for token, data in self._active_tokens.items()
-            if data.username == username
-        ]
-        for token in tokens_to_remove:
-            del self._active_tokens[token]
+        self._revoke_user_tokens(username)
         
         self._save_users()
         return True
 
-    def change_password(self, username: str, old_password: str, new_password: str) -> bool:
+    async def change_password(self, username: str, old_password: str, new_password: str) -> bool:
         """修改密码"""
-        if username not in self._users:
+        user = self._users.get(username)
+        if user is None:
             return False
 
-        user = self._users[username]
-        if not self._verify_password(old_password, user.password_hash):
+        stored_hash = user.password_hash
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(
+            _pw_executor, self._verify_password, old_password, stored_hash
+        ):
             return False
 
-        user.password_hash = self._hash_password(new_password)
+        new_hash = await loop.run_in_executor(_pw_executor, self._hash_password, new_password)
+        # 哈希计算期间密码可能已被其他请求修改，旧密码不再有效
+        if user.password_hash != stored_hash:
+            return False
+        user.password_hash = new_hash
         # 清除该用户的所有 token，强制重新登录
-        tokens_to_remove = [
-            token for token, data in self._active_tokens.items()
-            if data.username == username
-        ]
-        for token in tokens_to_remove:
-            del self._active_tokens[token]
+        self._revoke_user_tokens(username)
         
         self._save_users()
         return True
 
-    def authenticate(self, username: str, password: str) -> Optional[str]:
-        """验证用户并返回 token，登录成功后自动升级旧密码哈希格式"""
-        if username not in self._users:
+    async def authenticate(self, username: str, password: str) -> Optional[str]:
+        """验证用户并返回 token，登录成功后自动升级旧密码哈希格式
+
+        密码哈希在线程池中计算，不阻塞事件循环。
+        """
+        user = self._users.get(username)
+        if user is None:
+            return None
+
+        # 记下校验所用的哈希：await 期间密码可能被修改（旧 token 随之吊销）
+        stored_hash = user.password_hash
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(
+            _pw_executor, self._verify_password, password, stored_hash
+        ):
             return None
 
-        user = self._users[username]
-        if not self._verify_password(password, user.password_hash):
+        # 旧格式哈希自动升级为当前格式（C-03 修复）
+        new_hash = None
+        if self._needs_rehash(stored_hash):
+            new_hash = await loop.run_in_executor(_pw_executor, self._hash_password, password)
+
+        # 校验期间用户可能已被删除或修改了密码，此时不能写回旧密码、也不能签发 token
+        if self._users.get(username) is not user or user.password_hash != stored_hash:
             return None
 
-        # 旧格式哈希自动升级为 PBKDF2（C-03 修复）
-        if not user.password_hash.startswith(_HASH_PREFIX):
-            user.password_hash = self._hash_password(password)
+        upgraded = new_hash is not None
+        if upgraded:
+            user.password_hash = new_hash
 
-        # 更新最后登录时间
+        # 更新最后登录时间；仅 last_login 变化时延迟写盘，哈希升级需立即落盘
         user.last_login = datetime.now()
-        self._save_users()
+        if upgraded:
+            self._save_users()
+        else:
+            self._schedule_save_users()
         
         # 创建 token
-        token = create_access_token(username, self._jwt_secret)
+        token = create_access_token(username, self._jwt_secret_bytes)
+        now = int(time.time())
         self._active_tokens[token] = TokenData(
             username=username,
-            exp=datetime.now() + timedelta(hours=24),
-            iat=datetime.now(),
+            exp=now + _TOKEN_TTL_SECONDS,
+            iat=now,
         )
+        self._tokens_by_user.setdefault(username, set()).add(token)
         return token
 
     def verify_token(self, token: str) -> Optional[str]:
         """验证 token 并返回用户名"""
-        if token not in self._active_tokens:
+        token_data = self._active_tokens.get(token)
+        if token_data is None:
             return None
-        
-        token_data = self._active_tokens[token]
-        if datetime.now() > token_data.exp:
+
+        if time.time() > token_data.exp:
             del self._active_tokens[token]
+            self._discard_token(token, token_data.username)
             return None
         
         return token_data.username
 
     def logout(self, token: str) -> bool:
         """登出"""
-        if token in self._active_tokens:
-            del self._active_tokens[token]
-            return True
-        return False
+        token_data = self._active_tokens.pop(token, None)
+        if token_data is None:
+            return False
+        self._discard_token(token, token_data.username)
+        return True
 
     def get_users(self) -> list[dict]:
         """获取所有用户列表"""
@@ -268,16 +460,43 @@ class AuthManager:
         return len(self._users) > 0
 
 
-def create_access_token(username: str, secret: str) -> str:
-    """创建访问令牌"""
+def _signing_key(secret: str | bytes) -> bytes:
+    """将 JWT secret 转为 BLAKE2b 密钥
+
+    默认 secret 为 64 位 hex 字符串，直接解码为 32 字节；
+    非 hex 或超出 BLAKE2b 密钥上限（64 字节）的旧版 secret 先做 SHA-256。
+    """
+    if isinstance(secret, bytes):
+        return secret
+    try:
+        key = bytes.fromhex(secret)
+    except ValueError:
+        key = b""
+    if not key or len(key) > hashlib.blake2b.MAX_KEY_SIZE:
+        key = hashlib.sha256(secret.encode("utf-8")).digest()
+    return key
+
+
+def _sign(data: str, key: bytes) -> str:
+    """使用 BLAKE2b 带密钥模式计算签名（单次哈希的 MAC），输出无填充 base64url"""
+    digest = hashlib.blake2b(data.encode("utf-8"), key=key, digest_size=12).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def create_access_token(username: str, secret: str | bytes) -> str:
+    """创建访问令牌
+
+    格式: {username}:{timestamp_ms}:{random}:{signature}
+    random 与 signature 均为 base64url（不含 ":"），比 hex 编码短约三分之一
+    """
     timestamp = str(int(time.time() * 1000))
-    random_part = secrets.token_hex(16)
+    random_part = secrets.token_urlsafe(16)
     data = f"{username}:{timestamp}:{random_part}"
-    signature = hashlib.sha256(f"{data}:{secret}".encode()).hexdigest()[:32]
+    signature = _sign(data, _signing_key(secret))
     return f"{data}:{signature}"
 
 
-def verify_token(token: str, secret: str) -> Optional[str]:
+def verify_token(token: str, secret: str | bytes) -> Optional[str]:
     """验证令牌并返回用户名"""
     try:
         parts = token.split(":")
@@ -286,7 +505,7 @@ def verify_token(token: str, secret: str) -> Optional[str]:
 
         username, timestamp, random_part, signature = parts
         data = f"{username}:{timestamp}:{random_part}"
-        expected_signature = hashlib.sha256(f"{data}:{secret}".encode()).hexdigest()[:32]
+        expected_signature = _sign(data, _signing_key(secret))
 
         # 使用常数时间比较，防止时序攻击（C-04 修复）
         if not hmac.compare_digest(signature, expected_signature):
@@ -307,3 +526,9 @@ def get_auth_manager() -> AuthManager:
     if _auth_manager is None:
         _auth_manager = AuthManager()
     return _auth_manager
+
+
+def close_auth_manager() -> None:
+    """写入全局认证管理器待保存的数据（未创建时不做任何事）"""
+    if _auth_manager is not None:
+        _auth_manager.close()
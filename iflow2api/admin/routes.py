@@ -38,6 +38,9 @@ admin_router = APIRouter(prefix="/admin", tags=["Admin"])
 # HTTP Bearer 认证方案
 security = HTTPBearer(auto_error=False)
 
+# 首次登录创建管理员时加锁：创建用户需 await 哈希计算，检查与创建之间可能交错
+_first_login_lock = asyncio.Lock()
+
 
 # 请求/响应模型
 class LoginRequest(BaseModel):
@@ -107,18 +110,22 @@ async def login(request: LoginRequest) -> dict[str, Any]:
     """用户登录"""
     auth_manager = get_auth_manager()
     
-    # 如果没有用户，创建第一个用户
+    # 如果没有用户，创建第一个用户；并发的首次登录只有一个能创建，其余按普通登录校验
     if not auth_manager.has_users():
-        auth_manager.create_user(request.username, request.password)
-        token = auth_manager.authenticate(request.username, request.password)
-        return {
-            "success": True,
-            "token": token,
-            "message": "首次登录，已创建管理员账户",
-            "is_first_login": True,
-        }
-    
-    token = auth_manager.authenticate(request.username, request.password)
+        async with _first_login_lock:
+            if not auth_manager.has_users() and await auth_manager.create_user(
+                request.username, request.password
+            ):
+                token = await auth_manager.authenticate(request.username, request.password)
+                if token is not None:
+                    return {
+                        "success": True,
+                        "token": token,
+                        "message": "首次登录，已创建管理员账户",
+                        "is_first_login": True,
+                    }
+    
+    token = await auth_manager.authenticate(request.username, request.password)
     if token is None:
         raise HTTPException(status_code=401, detail="用户名或密码错误")
     
@@ -149,7 +156,7 @@ async def change_password(
 ) -> dict[str, Any]:
     """修改密码"""
     auth_manager = get_auth_manager()
-    success = auth_manager.change_password(username, request.old_password, request.new_password)
+    success = await auth_manager.change_password(username, request.old_password, request.new_password)
     
     if not success:
         raise HTTPException(status_code=400, detail="原密码错误")
@@ -183,7 +190,7 @@ async def create_user(
 ) -> dict[str, Any]:
     """创建新用户"""
     auth_manager = get_auth_manager()
-    success = auth_manager.create_user(request.username, request.password)
+    success = await auth_manager.create_user(request.username, request.password)
     
     if not success:
         raise HTTPException(status_code=400, detail="用户名已存在")
@@ -385,6 +392,10 @@ async def update_settings(
         settings.custom_auth_header = request.custom_auth_header
     
     save_settings(settings)
+
+    # 通知刷新器按新配置重新计算下次检查时刻
+    from ..token_refresher import get_global_refresher
+    get_global_refresher().notify_settings_changed()
     
     # 广播设置变更
     connection_manager = get_connection_manager()
@@ -578,8 +589,12 @@ async def oauth_callback(
         if token_data.get("refresh_token"):
             settings.oauth_refresh_token = token_data["refresh_token"]
         if token_data.get("expires_at"):
-            settings.oauth_expires_at = token_data["expires_at"].isoformat()
+            settings.oauth_expires_at = token_data["expires_at"].timestamp()
         save_settings(settings)
+
+        # 唤醒刷新器，按新 token 的过期时间重新安排刷新
+        from ..token_refresher import get_global_refresher
+        get_global_refresher().kick()
         
         return {
             "success": True,
@@ -674,6 +674,10 @@ function handleWebSocketMessage(data) {
         case 'pong':
             // 心跳响应
             break;
+        case 'batch':
+            // 服务端合并发送的多条消息
+            (data.items || []).forEach(handleWebSocketMessage);
+            break;
     }
 }
 
@@ -1,80 +1,169 @@
 """WebSocket 连接管理器 - 实时状态推送"""
 
 import asyncio
-import json
+import time
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Optional
 
 from fastapi import WebSocket
 
+from .. import fastjson
+
+
+# 推送消息时间戳精度（每秒刻度数），同一刻度内复用 isoformat 结果
+_TIMESTAMP_TICKS_PER_SECOND = 20
+
+
+@lru_cache(maxsize=1)
+def _iso_timestamp(tick: int) -> str:
+    """按时间刻度缓存的 ISO 时间字符串"""
+    return datetime.now().isoformat()
+
+
+def _now_iso() -> str:
+    """当前时间的 ISO 字符串，50ms 内的高频推送共用同一结果"""
+    return _iso_timestamp(int(time.time() * _TIMESTAMP_TICKS_PER_SECOND))
+
+
+# 单个连接的待发送队列上限，超出时优先丢弃最旧的可合并消息
+_OUTBOX_MAX_SIZE = 256
+# 写任务收到消息后等待的合并窗口（秒），窗口内的消息打包为一帧发送
+_BATCH_WINDOW_SECONDS = 0.01
+# 可合并的消息类型：队列中只保留最新一条（"log" 等其他类型逐条保留）
+_COALESCE_TYPES = frozenset({"status", "metrics"})
+
+
+class _Outbox:
+    """单个连接的待发送队列，由该连接唯一的写任务消费"""
+
+    __slots__ = ("messages", "ready", "task")
+
+    def __init__(self):
+        # (消息类型, 已序列化的 JSON 文本)
+        self.messages: deque[tuple[Optional[str], str]] = deque()
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def put(self, message_type: Optional[str], text: str) -> None:
+        """入队消息，合并同类状态消息并在超限时丢弃旧消息"""
+        messages = self.messages
+        if message_type in _COALESCE_TYPES and messages:
+            # 新状态覆盖队列中尚未发送的旧状态
+            self.messages = messages = deque(m for m in messages if m[0] != message_type)
+        messages.append((message_type, text))
+
+        while len(messages) > _OUTBOX_MAX_SIZE:
+            for index, (queued_type, _) in enumerate(messages):
+                if queued_type in _COALESCE_TYPES:
+                    del messages[index]
+                    break
+            else:
+                messages.popleft()
+
+        self.ready.set()
+
+    def drain(self) -> Optional[str]:
+        """取出全部待发送消息，多条时合并为一个 batch 消息"""
+        messages = self.messages
+        self.ready.clear()
+        if not messages:
+            return None
+        if len(messages) == 1:
+            text = messages[0][1]
+        else:
+            # 各消息已是 JSON 文本，直接拼接，无需重新序列化
+            text = '{"type":"batch","items":[' + ",".join(m[1] for m in messages) + "]}"
+        messages.clear()
+        return text
+
 
 class ConnectionManager:
-    """WebSocket 连接管理器"""
+    """WebSocket 连接管理器
+
+    每个连接有独立的发送队列和唯一的写任务：广播只做入队，不等待网络发送；
+    写任务把短时间内的多条消息合并为一帧发出，减少突发推送时的发送次数。
+    """
 
     def __init__(self):
-        self._connections: list[WebSocket] = []
+        self._connections: dict[WebSocket, _Outbox] = {}
         self._lock = asyncio.Lock()
 
     async def connect(self, websocket: WebSocket) -> None:
         """接受新连接"""
         await websocket.accept()
+        outbox = _Outbox()
+        outbox.task = asyncio.create_task(self._writer(websocket, outbox))
         async with self._lock:
-            self._connections.append(websocket)
+            self._connections[websocket] = outbox
 
     async def disconnect(self, websocket: WebSocket) -> None:
         """断开连接"""
         async with self._lock:
-            if websocket in self._connections:
-                self._connections.remove(websocket)
+            outbox = self._connections.pop(websocket, None)
+        if outbox is not None and outbox.task is not None and outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
 
-    async def send_personal(self, websocket: WebSocket, message: dict[str, Any]) -> None:
-        """发送个人消息"""
+    async def _writer(self, websocket: WebSocket, outbox: _Outbox) -> None:
+        """连接的写任务：等待消息、合并窗口内的消息并发送"""
         try:
-            await websocket.send_json(message)
+            while True:
+                await outbox.ready.wait()
+                await asyncio.sleep(_BATCH_WINDOW_SECONDS)
+                text = outbox.drain()
+                if text is not None:
+                    await websocket.send({"type": "websocket.send", "text": text})
+        except asyncio.CancelledError:
+            raise
         except Exception:
+            # 发送失败视为连接已断开
             await self.disconnect(websocket)
 
+    async def send_personal(self, websocket: WebSocket, message: dict[str, Any]) -> None:
+        """发送个人消息（经由该连接的写任务发送，保证消息顺序）"""
+        outbox = self._connections.get(websocket)
+        if outbox is None:
+            return
+        outbox.put(message.get("type"), fastjson.dumps(message).decode("utf-8"))
+
     async def broadcast(self, message: dict[str, Any]) -> None:
-        """广播消息到所有连接"""
+        """广播消息到所有连接
+
+        消息只序列化一次，放入各连接的发送队列后立即返回，
+        实际发送由各连接的写任务完成，慢连接不会拖慢广播方。
+        """
+        text = fastjson.dumps(message).decode("utf-8")
+        message_type = message.get("type")
+
         async with self._lock:
-            disconnected = []
-            for connection in self._connections:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    disconnected.append(connection)
-            
-            # 移除断开的连接
-            for connection in disconnected:
-                self._connections.remove(connection)
+            outboxes = tuple(self._connections.values())
+        for outbox in outboxes:
+            outbox.put(message_type, text)
+
+    @staticmethod
+    def _make_envelope(message_type: str, data: Any) -> dict[str, Any]:
+        """构造带类型和时间戳的推送消息"""
+        return {
+            "type": message_type,
+            "timestamp": _now_iso(),
+            "data": data,
+        }
 
     async def broadcast_status(self, status: dict[str, Any]) -> None:
         """广播状态更新"""
-        await self.broadcast({
-            "type": "status",
-            "timestamp": datetime.now().isoformat(),
-            "data": status,
-        })
+        await self.broadcast(self._make_envelope("status", status))
 
     async def broadcast_log(self, log_level: str, message: str, details: Optional[dict] = None) -> None:
         """广播日志消息"""
-        await self.broadcast({
-            "type": "log",
-            "timestamp": datetime.now().isoformat(),
-            "data": {
-                "level": log_level,
-                "message": message,
-                "details": details or {},
-            },
-        })
+        data: dict[str, Any] = {"level": log_level, "message": message}
+        if details:
+            data["details"] = details
+        await self.broadcast(self._make_envelope("log", data))
 
     async def broadcast_metrics(self, metrics: dict[str, Any]) -> None:
         """广播指标数据"""
-        await self.broadcast({
-            "type": "metrics",
-            "timestamp": datetime.now().isoformat(),
-            "data": metrics,
-        })
+        await self.broadcast(self._make_envelope("metrics", metrics))
 
     @property
     def connection_count(self) -> int:
@@ -17,9 +17,9 @@ from pydantic import BaseModel, ConfigDict
 
 logger = logging.getLogger("iflow2api")
 
-from .config import load_iflow_config, check_iflow_login, IFlowConfig, save_iflow_config
+from .config import load_iflow_config, check_iflow_login, IFlowConfig
 from .proxy import IFlowProxy
-from .token_refresher import OAuthTokenRefresher
+from .token_refresher import OAuthTokenRefresher, get_global_refresher, stop_global_refresher
 from .vision import (
     is_vision_model,
     supports_vision,
@@ -543,8 +543,14 @@ def get_proxy() -> IFlowProxy:
 
 
 def update_proxy_token(token_data: dict):
-    """Token 刷新回调，同步更新内存中的代理配置并保存"""
+    """Token 刷新回调，同步更新内存中的代理配置
+
+    刷新器已在回调前保存配置，这里不再重复写盘。
+    """
     global _proxy, _config
+    if token_data.get("error"):
+        # 刷新失败通知，不包含新 token
+        return
     if _proxy and _config:
         logger.info("检测到 Token 刷新，更新代理配置")
         _config.api_key = token_data["access_token"]
@@ -555,10 +561,6 @@ def update_proxy_token(token_data: dict):
             _config.oauth_refresh_token = token_data["refresh_token"]
         if "expires_at" in token_data:
             _config.oauth_expires_at = token_data["expires_at"]
-        
-        # 保存到配置文件
-        save_iflow_config(_config)
-        logger.info("Token 已保存到配置文件")
 
 
 @asynccontextmanager
@@ -596,8 +598,8 @@ async def lifespan(app: FastAPI):
         if config.model_name:
             logger.info("默认模型: %s", config.model_name)
             
-        # 启动 Token 刷新任务
-        _refresher = OAuthTokenRefresher()
+        # 启动 Token 刷新任务；使用全局刷新器，登录完成后的 kick() 才能唤醒它
+        _refresher = get_global_refresher()
         _refresher.set_refresh_callback(update_proxy_token)
         _refresher.start()
         logger.info("已启动 Token 自动刷新任务")
@@ -618,13 +620,17 @@ async def lifespan(app: FastAPI):
 
     # 关闭时清理
     if _refresher:
-        _refresher.stop()
+        stop_global_refresher()
         _refresher = None
         
     if _proxy:
         await _proxy.close()
         _proxy = None
 
+    # 写入延迟保存的 last_login，避免正常关闭时丢失
+    from .admin.auth import close_auth_manager
+    close_auth_manager()
+
 
 # 创建 FastAPI 应用
 app = FastAPI(
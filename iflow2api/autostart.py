@@ -8,7 +8,7 @@
 
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 
 def get_exe_path() -> str:
@@ -59,6 +59,73 @@ def get_auto_start() -> bool:
 # ==================== Windows 实现 ====================
 
 
+_RUN_KEY_PATH = r"Software\Microsoft\Windows\CurrentVersion\Run"
+
+# 缓存的 Run 注册表键句柄（winreg.HKEYType），GUI 轮询时避免反复 RegOpenKeyEx
+_run_key_handle: Optional[Any] = None
+# 缓存的句柄是否带写权限（没有写权限时查询使用只读句柄）
+_run_key_writable = False
+_run_key_atexit_registered = False
+
+
+def _get_run_key(write: bool = False) -> Any:
+    """Windows: 获取 Run 注册表键句柄（懒打开并缓存，进程退出时关闭）
+
+    优先以读写权限打开；仅查询且写权限被拒绝时回退为只读句柄。
+
+    Args:
+        write: 是否需要写权限
+    """
+    global _run_key_handle, _run_key_writable, _run_key_atexit_registered
+    if _run_key_handle is not None and (_run_key_writable or not write):
+        return _run_key_handle
+
+    import atexit
+    import winreg
+
+    try:
+        handle = winreg.OpenKey(
+            winreg.HKEY_CURRENT_USER,
+            _RUN_KEY_PATH,
+            0,
+            winreg.KEY_SET_VALUE | winreg.KEY_QUERY_VALUE,
+        )
+        writable = True
+    except PermissionError:
+        if write:
+            raise
+        handle = winreg.OpenKey(
+            winreg.HKEY_CURRENT_USER,
+            _RUN_KEY_PATH,
+            0,
+            winreg.KEY_QUERY_VALUE,
+        )
+        writable = False
+
+    # 以读写句柄替换之前的只读句柄
+    _close_run_key()
+    _run_key_handle = handle
+    _run_key_writable = writable
+    if not _run_key_atexit_registered:
+        atexit.register(_close_run_key)
+        _run_key_atexit_registered = True
+    return _run_key_handle
+
+
+def _close_run_key() -> None:
+    """Windows: 关闭缓存的 Run 注册表键句柄"""
+    global _run_key_handle, _run_key_writable
+    if _run_key_handle is not None:
+        import winreg
+
+        try:
+            winreg.CloseKey(_run_key_handle)
+        except OSError:
+            pass
+        _run_key_handle = None
+        _run_key_writable = False
+
+
 def _set_auto_start_windows(enabled: bool) -> bool:
     """Windows: 使用注册表设置开机自启动"""
     import winreg
@@ -67,12 +134,7 @@ def _set_auto_start_windows(enabled: bool) -> bool:
     exe_path = get_exe_path()
 
     try:
-        key = winreg.OpenKey(
-            winreg.HKEY_CURRENT_USER,
-            r"Software\Microsoft\Windows\CurrentVersion\Run",
-            0,
-            winreg.KEY_SET_VALUE | winreg.KEY_QUERY_VALUE,
-        )
+        key = _get_run_key(write=True)
 
         if enabled:
             winreg.SetValueEx(key, app_name, 0, winreg.REG_SZ, exe_path)
@@ -82,9 +144,10 @@ def _set_auto_start_windows(enabled: bool) -> bool:
             except FileNotFoundError:
                 pass
 
-        winreg.CloseKey(key)
         return True
     except Exception:
+        # 句柄可能已失效，下次调用时重新打开
+        _close_run_key()
         return False
 
 
@@ -95,21 +158,15 @@ def _get_auto_start_windows() -> bool:
     app_name = "iflow2api"
 
     try:
-        key = winreg.OpenKey(
-            winreg.HKEY_CURRENT_USER,
-            r"Software\Microsoft\Windows\CurrentVersion\Run",
-            0,
-            winreg.KEY_QUERY_VALUE,
-        )
+        key = _get_run_key()
 
         try:
             winreg.QueryValueEx(key, app_name)
-            winreg.CloseKey(key)
             return True
         except FileNotFoundError:
-            winreg.CloseKey(key)
             return False
     except Exception:
+        _close_run_key()
         return False
 
 
@@ -8,6 +8,8 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
+from . import fastjson
+
 logger = logging.getLogger("iflow2api")
 
 
@@ -52,10 +54,26 @@ def get_installation_id_path() -> Path:
     return home / ".iflow" / "installation_id"
 
 
+# load_iflow_config 解析结果缓存: (文件状态, 配置)
+# 文件状态为 settings.json 与 installation_id 的 (mtime_ns, size)，文件未变化时跳过读盘与解析
+_config_cache: Optional[tuple[tuple, IFlowConfig]] = None
+
+
+def file_state(path: Path) -> Optional[tuple[int, int]]:
+    """获取文件的 (mtime_ns, size)，文件不存在时返回 None；用作配置缓存的失效依据"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def load_iflow_config() -> IFlowConfig:
     """
     从 iFlow CLI 配置文件加载认证信息
 
+    解析结果按文件 mtime/size 缓存，每次返回独立副本，调用方可安全修改。
+
     Returns:
         IFlowConfig: 包含 API Key 和 Base URL 的配置对象
 
@@ -63,16 +81,24 @@ def load_iflow_config() -> IFlowConfig:
         FileNotFoundError: 配置文件不存在
         ValueError: 配置文件格式错误或缺少必要字段
     """
+    global _config_cache
+
     config_path = get_iflow_config_path()
+    installation_id_path = get_installation_id_path()
 
-    if not config_path.exists():
+    config_state = file_state(config_path)
+    if config_state is None:
         raise FileNotFoundError(
             f"iFlow 配置文件不存在: {config_path}\n请先运行 iflow 命令并完成登录"
         )
 
+    cache_key = (str(config_path), config_state, file_state(installation_id_path))
+    cached = _config_cache
+    if cached is not None and cached[0] == cache_key:
+        return cached[1].model_copy()
+
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = fastjson.loads(config_path.read_bytes())
     except json.JSONDecodeError as e:
         raise ValueError(f"iFlow 配置文件格式错误: {e}")
 
@@ -108,7 +134,6 @@ def load_iflow_config() -> IFlowConfig:
 
     # 尝试读取 installation_id
     installation_id = None
-    installation_id_path = get_installation_id_path()
     if installation_id_path.exists():
         try:
             installation_id = installation_id_path.read_text(encoding="utf-8").strip()
@@ -118,7 +143,7 @@ def load_iflow_config() -> IFlowConfig:
     # apiKey 过期时间（OAuth 模式下与 oauth_expires_at 相同）
     api_key_expires_at = oauth_expires_at
 
-    return IFlowConfig(
+    config = IFlowConfig(
         api_key=api_key,
         base_url=base_url,
         model_name=model_name,
@@ -130,6 +155,8 @@ def load_iflow_config() -> IFlowConfig:
         oauth_expires_at=oauth_expires_at,
         api_key_expires_at=api_key_expires_at,
     )
+    _config_cache = (cache_key, config.model_copy())
+    return config
 
 
 def check_iflow_login() -> bool:
@@ -169,6 +196,8 @@ def save_iflow_config(config: IFlowConfig) -> None:
     Args:
         config: IFlowConfig 配置对象
     """
+    global _config_cache
+
     config_path = get_iflow_config_path()
     config_dir = config_path.parent
     config_dir.mkdir(parents=True, exist_ok=True)
@@ -177,8 +206,7 @@ def save_iflow_config(config: IFlowConfig) -> None:
     existing_data: dict = {}
     if config_path.exists():
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
+            existing_data = fastjson.loads(config_path.read_bytes())
         except (json.JSONDecodeError, OSError):
             existing_data = {}
 
@@ -201,6 +229,6 @@ def save_iflow_config(config: IFlowConfig) -> None:
     if config.api_key_expires_at is not None:
         existing_data["api_key_expires_at"] = config.api_key_expires_at.isoformat()
 
-    # 保存到文件
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, indent=2, ensure_ascii=False)
+    # 保存到文件，并使 load_iflow_config 缓存失效
+    config_path.write_bytes(fastjson.dumps(existing_data, indent=True))
+    _config_cache = None
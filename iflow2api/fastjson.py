@@ -0,0 +1,59 @@
+"""JSON 编解码 - 优先使用 orjson，未安装时回退到标准库 json
+
+orjson 由 Rust 实现，解析/序列化速度明显快于标准库，且直接输出 bytes。
+通过 'pip install iflow2api[full]' 或 'pip install orjson' 启用。
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+# 尝试导入 orjson
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+
+def loads(data: bytes | str) -> Any:
+    """解析 JSON
+
+    orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，
+    调用方统一捕获 json.JSONDecodeError 即可。
+
+    Args:
+        data: JSON 文本（bytes 或 str）
+
+    Returns:
+        解析结果
+    """
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(
+    obj: Any,
+    *,
+    indent: bool = False,
+    default: Optional[Callable[[Any], Any]] = None,
+) -> bytes:
+    """序列化为 UTF-8 编码的 JSON bytes
+
+    Args:
+        obj: 要序列化的对象
+        indent: 是否使用 2 空格缩进（用于写入配置文件）
+        default: 无法直接序列化的对象的转换函数
+
+    Returns:
+        JSON bytes（非 ASCII 字符原样输出，不做转义）
+    """
+    if HAS_ORJSON:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=default, option=option)
+    if indent:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, default=default)
+    else:
+        text = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=default)
+    return text.encode("utf-8")
@@ -572,11 +572,17 @@ class IFlow2ApiApp:
         """保存配置"""
         self._update_settings_from_ui()
         save_settings(self.settings)
+        self._notify_settings_changed()
         self._add_log(t("log.settings_saved"))
 
         # 显示提示
         self._show_snack_bar(t("message.settings_saved"))
 
+    def _notify_settings_changed(self):
+        """通知 token 刷新器配置已变更，立即重新计算下次检查时刻"""
+        from .token_refresher import get_global_refresher
+        get_global_refresher().notify_settings_changed()
+
     def _show_settings_dialog(self, e):
         """显示应用设置对话框"""
         # 创建对话框中的设置组件
@@ -724,6 +730,7 @@ class IFlow2ApiApp:
             
             # 保存设置到文件
             save_settings(self.settings)
+            self._notify_settings_changed()
             
             self._add_log(t("log.settings_saved"))
             self._show_snack_bar(t("message.settings_saved"))
@@ -1,15 +1,17 @@
 """多实例管理模块 - 支持多个服务实例"""
 
-import json
 import logging
+import os
 import socket
+import sys
 import time
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import Any, Optional
 
-from pydantic import BaseModel
+from . import fastjson
 
 logger = logging.getLogger("iflow2api")
 
@@ -23,7 +25,8 @@ class InstanceStatus(Enum):
     ERROR = "error"
 
 
-class InstanceConfig(BaseModel):
+@dataclass(slots=True)
+class InstanceConfig:
     """实例配置"""
     id: str
     name: str
@@ -31,27 +34,33 @@ class InstanceConfig(BaseModel):
     port: int = 28000
     api_key: str = ""
     base_url: str = "https://apis.iflow.cn/v1"
-    created_at: datetime = datetime.now()
-    updated_at: datetime = datetime.now()
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
 
 
-class InstanceInfo(BaseModel):
+@dataclass(slots=True)
+class InstanceInfo:
     """实例信息"""
     config: InstanceConfig
     status: InstanceStatus = InstanceStatus.STOPPED
     error_message: str = ""
-    started_at: Optional[datetime] = None
+    # 启动时间（Unix 纳秒），写入时不创建 datetime 对象
+    started_at_ns: Optional[int] = None
     request_count: int = 0
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat() if v else None
-        }
+    @property
+    def started_at(self) -> Optional[datetime]:
+        """启动时间，读取时才转换为 datetime"""
+        if self.started_at_ns is None:
+            return None
+        return datetime.fromtimestamp(self.started_at_ns / 1e9)
+
+
+def _json_default(value: Any) -> Any:
+    """序列化 datetime 为 ISO 格式字符串"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
 
 class InstanceManager:
@@ -66,17 +75,55 @@ class InstanceManager:
         """
         self._config_dir = config_dir or Path.home() / ".iflow2api" / "instances"
         self._instances: dict[str, InstanceInfo] = {}
+        # 辅助索引：按状态、按端口查找实例 ID，避免全量扫描
+        self._by_status: dict[InstanceStatus, set[str]] = {status: set() for status in InstanceStatus}
+        self._by_port: dict[int, set[str]] = {}
+        self._total_requests = 0
         self._load_instances()
 
+    def _index_add(self, instance: InstanceInfo) -> None:
+        """将实例加入辅助索引"""
+        instance_id = instance.config.id
+        self._by_status[instance.status].add(instance_id)
+        self._by_port.setdefault(instance.config.port, set()).add(instance_id)
+        self._total_requests += instance.request_count
+
+    def _index_remove(self, instance: InstanceInfo) -> None:
+        """将实例从辅助索引中移除"""
+        instance_id = instance.config.id
+        self._by_status[instance.status].discard(instance_id)
+        self._unindex_port(instance.config.port, instance_id)
+        self._total_requests -= instance.request_count
+
+    def _port_has_running_instance(self, port: int) -> bool:
+        """端口是否被运行中的实例使用"""
+        running = self._by_status[InstanceStatus.RUNNING]
+        return any(i in running for i in self._by_port.get(port, ()))
+
+    def _unindex_port(self, port: int, instance_id: str) -> None:
+        """从端口索引中移除实例 ID，端口下无实例时删除该键"""
+        ids = self._by_port.get(port)
+        if ids is not None:
+            ids.discard(instance_id)
+            if not ids:
+                del self._by_port[port]
+
     def _load_instances(self) -> None:
         """加载所有实例配置"""
-        if not self._config_dir.exists():
+        # 单次目录扫描，DirEntry 自带文件类型信息，无需逐个 stat
+        try:
+            with os.scandir(self._config_dir) as entries:
+                instance_files = [
+                    entry.path for entry in entries
+                    if entry.name.endswith(".json") and entry.is_file()
+                ]
+        except FileNotFoundError:
             return
 
-        for instance_file in self._config_dir.glob("*.json"):
+        for instance_file in instance_files:
             try:
-                with open(instance_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                with open(instance_file, "rb") as f:
+                    data = fastjson.loads(f.read())
 
                 config = InstanceConfig(
                     id=data["id"],
@@ -89,7 +136,12 @@ class InstanceManager:
                     updated_at=datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else datetime.now(),
                 )
 
-                self._instances[config.id] = InstanceInfo(config=config)
+                previous = self._instances.get(config.id)
+                if previous is not None:
+                    self._index_remove(previous)
+                instance = InstanceInfo(config=config)
+                self._instances[config.id] = instance
+                self._index_add(instance)
             except Exception as e:
                 logger.warning("加载实例配置失败 %s: %s", instance_file, e)
 
@@ -103,17 +155,9 @@ class InstanceManager:
 
         config_path = self._config_dir / f"{instance_id}.json"
         try:
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump({
-                    "id": instance.config.id,
-                    "name": instance.config.name,
-                    "host": instance.config.host,
-                    "port": instance.config.port,
-                    "api_key": instance.config.api_key,
-                    "base_url": instance.config.base_url,
-                    "created_at": instance.config.created_at.isoformat(),
-                    "updated_at": instance.config.updated_at.isoformat(),
-                }, f, indent=2, ensure_ascii=False)
+            config_path.write_bytes(
+                fastjson.dumps(asdict(instance.config), indent=True, default=_json_default)
+            )
             return True
         except Exception as e:
             logger.warning("保存实例配置失败: %s", e)
@@ -141,6 +185,11 @@ class InstanceManager:
         """检查端口是否可用"""
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                # 避免 TIME_WAIT 状态的端口被误判为占用。仅在 Linux 上设置：
+                # Windows 上 SO_REUSEADDR 允许抢占已绑定端口；macOS/BSD 上它允许
+                # 绑定 127.0.0.1 与监听 0.0.0.0 的进程共存，占用的端口会被误判为空闲
+                if sys.platform.startswith("linux"):
+                    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 s.bind((host if host != "0.0.0.0" else "127.0.0.1", port))
                 return True
         except OSError:
@@ -167,12 +216,12 @@ class InstanceManager:
         Returns:
             创建的实例信息，如果失败返回 None
         """
-        # 检查端口是否已被其他实例使用
-        for instance in self._instances.values():
-            if instance.config.port == port and instance.status == InstanceStatus.RUNNING:
-                return None
+        # 检查端口是否已被运行中的实例使用（查端口索引，先于任何分配工作）
+        if self._port_has_running_instance(port):
+            return None
 
         instance_id = self._generate_id()
+        now = datetime.now()
         config = InstanceConfig(
             id=instance_id,
             name=name,
@@ -180,10 +229,13 @@ class InstanceManager:
             port=port,
             api_key=api_key,
             base_url=base_url,
+            created_at=now,
+            updated_at=now,
         )
 
         instance = InstanceInfo(config=config)
         self._instances[instance_id] = instance
+        self._index_add(instance)
 
         if self._save_instance(instance_id):
             return instance
@@ -246,7 +298,9 @@ class InstanceManager:
             instance.config.name = name
         if host is not None:
             instance.config.host = host
-        if port is not None:
+        if port is not None and port != instance.config.port:
+            self._unindex_port(instance.config.port, instance_id)
+            self._by_port.setdefault(port, set()).add(instance_id)
             instance.config.port = port
         if api_key is not None:
             instance.config.api_key = api_key
@@ -279,6 +333,7 @@ class InstanceManager:
             return False
 
         del self._instances[instance_id]
+        self._index_remove(instance)
         return self._delete_instance_file(instance_id)
 
     def set_instance_status(
@@ -302,13 +357,16 @@ class InstanceManager:
             return False
 
         instance = self._instances[instance_id]
+        if instance.status != status:
+            self._by_status[instance.status].discard(instance_id)
+            self._by_status[status].add(instance_id)
         instance.status = status
         instance.error_message = error_message
 
         if status == InstanceStatus.RUNNING:
-            instance.started_at = datetime.now()
+            instance.started_at_ns = time.time_ns()
         elif status == InstanceStatus.STOPPED:
-            instance.started_at = None
+            instance.started_at_ns = None
 
         return True
 
@@ -322,10 +380,12 @@ class InstanceManager:
         Returns:
             是否成功
         """
-        if instance_id not in self._instances:
+        instance = self._instances.get(instance_id)
+        if instance is None:
             return False
 
-        self._instances[instance_id].request_count += 1
+        instance.request_count += 1
+        self._total_requests += 1
         return True
 
     def get_running_instances(self) -> list[InstanceInfo]:
@@ -335,10 +395,7 @@ class InstanceManager:
         Returns:
             运行中的实例列表
         """
-        return [
-            inst for inst in self._instances.values()
-            if inst.status == InstanceStatus.RUNNING
-        ]
+        return [self._instances[i] for i in self._by_status[InstanceStatus.RUNNING]]
 
     def get_instances_by_port(self, port: int) -> list[InstanceInfo]:
         """
@@ -350,10 +407,7 @@ class InstanceManager:
         Returns:
             实例列表
         """
-        return [
-            inst for inst in self._instances.values()
-            if inst.config.port == port
-        ]
+        return [self._instances[i] for i in self._by_port.get(port, ())]
 
     def find_available_port(self, start_port: int = 28000, max_attempts: int = 100) -> int:
         """
@@ -367,18 +421,12 @@ class InstanceManager:
             可用端口号
         """
         for port in range(start_port, start_port + max_attempts):
-            # 检查端口是否被系统占用
-            if not self.is_port_available("0.0.0.0", port):
+            # 先查索引：被运行中实例占用的端口无需系统调用
+            if self._port_has_running_instance(port):
                 continue
 
-            # 检查端口是否被其他实例使用
-            instances_on_port = self.get_instances_by_port(port)
-            running_on_port = [
-                inst for inst in instances_on_port
-                if inst.status == InstanceStatus.RUNNING
-            ]
-
-            if not running_on_port:
+            # 检查端口是否被系统占用
+            if self.is_port_available("0.0.0.0", port):
                 return port
 
         raise RuntimeError(f"无法找到可用端口 (尝试了 {max_attempts} 个端口)")
@@ -391,18 +439,13 @@ class InstanceManager:
             统计信息
         """
         total = len(self._instances)
-        running = len(self.get_running_instances())
-        stopped = total - running
-
-        total_requests = sum(
-            inst.request_count for inst in self._instances.values()
-        )
+        running = len(self._by_status[InstanceStatus.RUNNING])
 
         return {
             "total_instances": total,
             "running_instances": running,
-            "stopped_instances": stopped,
-            "total_requests": total_requests,
+            "stopped_instances": total - running,
+            "total_requests": self._total_requests,
         }
 
 
@@ -1,9 +1,9 @@
 """OAuth 登录功能的独立模块"""
 
+import os
 import secrets
-import webbrowser
-import threading
-import asyncio
+import sys
+from functools import lru_cache
 from typing import Optional
 
 from .oauth import IFlowOAuth
@@ -11,6 +11,18 @@ from .web_server import OAuthCallbackServer, find_available_port
 from .config import load_iflow_config, save_iflow_config, IFlowConfig
 
 
+@lru_cache(maxsize=1)
+def _has_browser_display() -> bool:
+    """是否可能打开图形浏览器
+
+    无 DISPLAY/WAYLAND_DISPLAY 的 Linux 主机（如服务器）上，webbrowser.open
+    会依次探测 xdg-settings、gio 等命令，阻塞数百毫秒且最终无法打开。
+    """
+    if sys.platform in ("darwin", "win32"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
 class OAuthLoginHandler:
     """OAuth 登录处理器"""
 
@@ -35,8 +47,13 @@ class OAuthLoginHandler:
         self._is_logging_in = True
         self.add_log("正在启动 OAuth 登录流程...")
 
+        # 按需导入，仅在发起登录时加载
+        import threading
+
         # 在后台线程中执行 OAuth 流程
         def oauth_login_thread():
+            import asyncio
+
             try:
                 # 1. 查找可用端口
                 port = find_available_port(start_port=11451, max_attempts=50)
@@ -61,11 +78,17 @@ class OAuthLoginHandler:
                     redirect_uri=server.get_callback_url(),
                     state=csrf_state,
                 )
-                webbrowser.open(auth_url)
-                self.add_log("已打开浏览器，请完成授权...")
+                if _has_browser_display():
+                    # webbrowser 会连带导入 subprocess、shutil 等模块，按需导入
+                    import webbrowser
+
+                    webbrowser.open(auth_url)
+                    self.add_log("已打开浏览器，请完成授权...")
+                else:
+                    self.add_log(f"请在浏览器打开: {auth_url}")
 
-                # 4. 等待回调（返回 state 供校验）
-                code, error, returned_state = server.wait_for_callback(timeout=60)
+                # 4. 等待回调（返回 state 供校验，以及从启动服务器到收到回调的耗时）
+                code, error, returned_state, latency_ms = server.wait_for_callback(timeout=60)
                 server.stop()
 
                 # 校验 state，防止 CSRF（C-05 修复）
@@ -84,7 +107,7 @@ class OAuthLoginHandler:
                     self._is_logging_in = False
                     return
 
-                self.add_log("收到授权码，正在获取 token...")
+                self.add_log(f"收到授权码（等待 {latency_ms / 1000:.1f} 秒），正在获取 token...")
 
                 # 5. 获取 token
                 async def get_token_async():
@@ -127,6 +150,9 @@ class OAuthLoginHandler:
                             existing_config.oauth_expires_at = token_data["expires_at"]
 
                         save_iflow_config(existing_config)
+                        # 唤醒刷新器，按新 token 的过期时间重新安排刷新
+                        from .token_refresher import get_global_refresher
+                        get_global_refresher().kick()
 
                         self.add_log(
                             f"登录成功！用户: {user_info.get('username', user_info.get('phone', 'Unknown'))}"
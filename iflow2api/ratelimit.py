@@ -1,14 +1,13 @@
 """速率限制模块 - 使用滑动窗口算法实现请求限流"""
 
 import time
-from collections import OrderedDict
+from bisect import bisect_right
+from itertools import islice
 from threading import Lock
-from typing import Optional
+from typing import NamedTuple, Optional
 
-from pydantic import BaseModel
 
-
-class RateLimitConfig(BaseModel):
+class RateLimitConfig(NamedTuple):
     """速率限制配置"""
     enabled: bool = True
     requests_per_minute: int = 60
@@ -16,15 +15,30 @@ class RateLimitConfig(BaseModel):
     requests_per_day: int = 10000
 
 
+_CLIENT_KEY_MASK = (1 << 63) - 1
+
+
+def client_key(client_id: str) -> int:
+    """将客户端标识映射为固定大小的非负整数键
+
+    同一进程内结果稳定；相同标识总是落在同一计数桶。
+    """
+    return hash(client_id) & _CLIENT_KEY_MASK
+
+
 class RateLimiter:
     """速率限制器 - 使用滑动窗口算法
 
     支持每分钟、每小时、每天的请求限制。
-    使用有序字典实现 LRU 驱逐，防止内存无限增长。
+    使用采样近似 LRU 驱逐，防止内存无限增长。
     """
 
     # 最多跟踪的客户端数量，防止内存耗尽
     MAX_TRACKED_CLIENTS = 10000
+    # 分片数量（2 的幂），不同客户端落在不同分片时互不争用锁
+    SHARD_COUNT = 16
+    # 驱逐时采样的候选客户端数量
+    EVICTION_SAMPLES = 16
 
     def __init__(
         self,
@@ -43,102 +57,141 @@ class RateLimiter:
         self.per_hour = per_hour
         self.per_day = per_day
 
-        # 使用 OrderedDict 实现 LRU 驱逐
-        # {client_id: [timestamp1, timestamp2, ...]}
-        self._requests: OrderedDict[str, list[float]] = OrderedDict()
-        self._lock = Lock()
-
-    def _get_requests(self, client_id: str, now: float) -> list[float]:
+        # 按 client_id 哈希分片，每个分片一个普通字典和一把锁
+        # 超限时采样驱逐，请求路径上无需维护 LRU 顺序
+        # {client_key: [timestamp1, timestamp2, ...]}，时间戳按追加顺序递增，可二分查找
+        # client_key 为 client_key() 得到的整数，整数键的哈希与比较都比字符串便宜
+        self._shards: list[tuple[dict[int, list[float]], Lock]] = [
+            ({}, Lock()) for _ in range(self.SHARD_COUNT)
+        ]
+        self._max_per_shard = max(1, self.MAX_TRACKED_CLIENTS // self.SHARD_COUNT)
+
+    def _shard(self, client_id: str | int) -> tuple[int, dict[int, list[float]], Lock]:
+        """获取客户端的整数键及其所属分片"""
+        key = client_id if isinstance(client_id, int) else client_key(client_id)
+        store, lock = self._shards[key & (self.SHARD_COUNT - 1)]
+        return key, store, lock
+
+    @staticmethod
+    def _get_requests(store: dict[int, list[float]], key: int, cutoff: float) -> list[float]:
         """获取并清理指定客户端的请求列表（仅清理超过1天的记录）
 
         统一以最大窗口（1天）做一次清理，避免多次清理导致计数错误。
+        列表按时间有序，二分定位过期边界后原地删除前缀，不再重建列表。
 
         Args:
-            client_id: 客户端标识
-            now: 当前时间戳
+            store: 客户端所属分片的请求字典
+            key: 客户端整数键
+            cutoff: 最大窗口（1天）的起始时间戳
 
         Returns:
             清理后的请求时间戳列表
         """
-        cutoff = now - 86400  # 最大窗口：1天
-        requests = self._requests.get(client_id, [])
+        requests = store.get(key)
         if requests:
-            cleaned = [t for t in requests if t > cutoff]
-            self._requests[client_id] = cleaned
-            # 移动到末尾（LRU 更新）
-            self._requests.move_to_end(client_id)
-            return cleaned
+            expired = bisect_right(requests, cutoff)
+            if expired:
+                del requests[:expired]
+            return requests
         return []
 
-    def _evict_if_needed(self) -> None:
-        """如果超过最大跟踪数量，驱逐最旧的条目"""
-        while len(self._requests) > self.MAX_TRACKED_CLIENTS:
-            self._requests.popitem(last=False)
+    def _evict_if_needed(self, store: dict[int, list[float]]) -> None:
+        """如果分片超过最大跟踪数量，驱逐最久未活动的条目
+
+        取插入顺序最早的若干个客户端作为候选，驱逐其中最后一次请求最早的一个
+        （与 Redis allkeys-lru 相同的采样近似 LRU）。
+        """
+        while len(store) > self._max_per_shard:
+            candidates = islice(store.items(), self.EVICTION_SAMPLES)
+            victim, _ = min(candidates, key=lambda item: item[1][-1] if item[1] else 0.0)
+            del store[victim]
+
+    @staticmethod
+    def _window_counts(requests: list[float], now: float) -> tuple[int, int, int]:
+        """统计分钟、小时、天三个窗口内的请求数
+
+        requests 已按天窗口清理且有序，天计数即列表长度，
+        其余两个窗口各一次二分查找，无需逐条遍历。
+
+        Args:
+            requests: 已清理的请求时间戳列表
+            now: 当前时间戳
 
-    def is_allowed(self, client_id: str = "default") -> tuple[bool, Optional[str]]:
+        Returns:
+            (分钟计数, 小时计数, 天计数)
+        """
+        total = len(requests)
+        return (
+            total - bisect_right(requests, now - 60),
+            total - bisect_right(requests, now - 3600),
+            total,
+        )
+
+    def is_allowed(self, client_id: str | int = "default") -> tuple[bool, Optional[str]]:
         """检查请求是否被允许
 
         Args:
-            client_id: 客户端标识（如 IP 地址或 API Key）
+            client_id: 客户端标识（如 IP 地址或 API Key），或预先计算的 client_key()
 
         Returns:
             (是否允许, 错误消息)
         """
-        with self._lock:
-            now = time.time()
+        key, store, lock = self._shard(client_id)
+        with lock:
+            # 单调时钟不受系统时间调整影响；在锁内取时间，保证同一客户端的时间戳有序追加
+            now = time.monotonic()
 
             # 一次性清理，获取当天内的所有请求记录
-            requests = self._get_requests(client_id, now)
+            requests = self._get_requests(store, key, now - 86400)
+            minute_count, hour_count, day_count = self._window_counts(requests, now)
 
-            # 在内存中按窗口计数（不再重复清理列表）
-            minute_count = sum(1 for t in requests if t > now - 60)
             if minute_count >= self.per_minute:
                 return False, f"Rate limit exceeded: {self.per_minute} requests per minute"
 
-            hour_count = sum(1 for t in requests if t > now - 3600)
             if hour_count >= self.per_hour:
                 return False, f"Rate limit exceeded: {self.per_hour} requests per hour"
 
-            # 剩余全部在1天内，直接计总数
-            if len(requests) >= self.per_day:
+            if day_count >= self.per_day:
                 return False, f"Rate limit exceeded: {self.per_day} requests per day"
 
             # 记录请求
             requests.append(now)
-            self._requests[client_id] = requests
-            self._evict_if_needed()
+            store[key] = requests
+            self._evict_if_needed(store)
             return True, None
 
-    def record_request(self, client_id: str = "default") -> None:
+    def record_request(self, client_id: str | int = "default") -> None:
         """记录一次请求（不做限制检查）
 
         Args:
-            client_id: 客户端标识
+            client_id: 客户端标识或 client_key()
         """
-        with self._lock:
-            now = time.time()
-            requests = self._requests.get(client_id, [])
+        key, store, lock = self._shard(client_id)
+        with lock:
+            now = time.monotonic()
+            requests = store.get(key, [])
             requests.append(now)
-            self._requests[client_id] = requests
-            self._requests.move_to_end(client_id)
-            self._evict_if_needed()
+            store[key] = requests
+            self._evict_if_needed(store)
 
-    def get_stats(self, client_id: str = "default") -> dict:
+    def get_stats(self, client_id: str | int = "default") -> dict:
         """获取客户端的请求统计
 
         Args:
-            client_id: 客户端标识
+            client_id: 客户端标识或 client_key()
 
         Returns:
             统计信息字典
         """
-        with self._lock:
-            now = time.time()
-            requests = self._get_requests(client_id, now)
+        key, store, lock = self._shard(client_id)
+        with lock:
+            now = time.monotonic()
+            requests = self._get_requests(store, key, now - 86400)
+            minute_count, hour_count, day_count = self._window_counts(requests, now)
             return {
-                "minute": sum(1 for t in requests if t > now - 60),
-                "hour": sum(1 for t in requests if t > now - 3600),
-                "day": len(requests),
+                "minute": minute_count,
+                "hour": hour_count,
+                "day": day_count,
                 "limits": {
                     "per_minute": self.per_minute,
                     "per_hour": self.per_hour,
@@ -146,17 +199,21 @@ class RateLimiter:
                 },
             }
 
-    def reset(self, client_id: Optional[str] = None) -> None:
+    def reset(self, client_id: Optional[str | int] = None) -> None:
         """重置请求计数
 
         Args:
-            client_id: 客户端标识，如果为 None 则重置所有
+            client_id: 客户端标识或 client_key()，如果为 None 则重置所有
         """
-        with self._lock:
-            if client_id is None:
-                self._requests.clear()
-            elif client_id in self._requests:
-                del self._requests[client_id]
+        if client_id is None:
+            for store, lock in self._shards:
+                with lock:
+                    store.clear()
+            return
+
+        key, store, lock = self._shard(client_id)
+        with lock:
+            store.pop(key, None)
 
 
 # 全局速率限制器实例
@@ -203,7 +260,7 @@ def check_rate_limit(client_id: str = "default") -> tuple[bool, Optional[str]]:
         (是否允许, 错误消息)
     """
     limiter = get_rate_limiter()
-    return limiter.is_allowed(client_id)
+    return limiter.is_allowed(client_key(client_id))
 
 
 def update_rate_limiter_settings(
@@ -229,6 +286,9 @@ def update_rate_limiter_settings(
 # 全局配置
 _rate_limit_config: Optional[RateLimitConfig] = None
 
+# ASGI 头部名称统一为小写 bytes
+_AUTH_HEADER = b"authorization"
+
 
 def init_limiter(config: RateLimitConfig) -> None:
     """初始化速率限制器
@@ -258,16 +318,19 @@ def create_rate_limit_middleware():
     from fastapi.responses import JSONResponse
     
     async def rate_limit_middleware(request: Request, call_next):
-        # 检查是否启用速率限制
+        # 检查是否启用速率限制（init_limiter 可能在中间件创建后才调用，因此每次检查）
         if _rate_limit_config is None or not _rate_limit_config.enabled:
             return await call_next(request)
         
         # 获取客户端标识（优先使用 API Key，其次使用 IP）
-        client_id = request.headers.get("Authorization", "")
-        if client_id:
-            # 使用 API Key 的前 20 个字符作为标识
-            client_id = client_id[:20]
-        else:
+        # 直接扫描 ASGI 原始头部列表，避免构造大小写不敏感的 Headers 对象
+        client_id = ""
+        for name, value in request.scope["headers"]:
+            if name == _AUTH_HEADER:
+                # 使用 API Key 的前 20 个字符作为标识
+                client_id = value[:20].decode("latin-1")
+                break
+        if not client_id:
             # 使用客户端 IP
             client_id = request.client.host if request.client else "unknown"
         
@@ -2,6 +2,7 @@
 
 import json
 import logging
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -9,7 +10,7 @@ from pydantic import BaseModel, Field
 
 logger = logging.getLogger("iflow2api")
 
-from .config import load_iflow_config, save_iflow_config, IFlowConfig
+from .config import load_iflow_config, save_iflow_config, IFlowConfig, file_state
 from .crypto import ConfigEncryption
 from .autostart import set_auto_start as _set_auto_start
 from .autostart import get_auto_start as _get_auto_start
@@ -31,7 +32,8 @@ class AppSettings(BaseModel):
     auth_type: str = "api-key"
     oauth_access_token: str = ""
     oauth_refresh_token: str = ""
-    oauth_expires_at: Optional[str] = None
+    # 过期时间（Unix 秒），检查时只需一次浮点比较
+    oauth_expires_at: Optional[float] = None
 
     # 公网访问地址（用于 WebUI OAuth 回调）
     # 示例：http://localhost:28000 或 https://api.example.com
@@ -111,13 +113,37 @@ def get_config_path() -> Path:
     return get_config_dir() / "config.json"
 
 
-def load_settings() -> AppSettings:
-    """加载配置"""
-    settings = AppSettings()
+def _parse_expires_at(value) -> Optional[float]:
+    """解析 OAuth 过期时间为 Unix 秒，兼容旧版本保存的 ISO 格式字符串"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        logger.warning("无法解析 OAuth 过期时间: %r", value)
+        return None
+
+
+# config.json 解析结果缓存: ((路径, mtime_ns, size), 配置)
+# 文件未变化时跳过读盘、JSON 解析和 token 解密
+_app_config_cache: Optional[tuple[tuple, AppSettings]] = None
+
+
+def _load_app_config() -> AppSettings:
+    """从 ~/.iflow2api/config.json 加载设置，按文件 mtime/size 缓存，返回独立副本"""
+    global _app_config_cache
 
-    # 首先从 ~/.iflow2api/config.json 加载所有设置（包括 api_key）
     app_config_path = get_config_path()
-    if app_config_path.exists():
+    state = file_state(app_config_path)
+    cache_key = (str(app_config_path), state)
+    cached = _app_config_cache
+    if cached is not None and cached[0] == cache_key:
+        return cached[1].model_copy()
+
+    settings = AppSettings()
+    if state is not None:
         try:
             with open(app_config_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
@@ -162,7 +188,7 @@ def load_settings() -> AppSettings:
                 if "oauth_refresh_token" in data:
                     settings.oauth_refresh_token = _decrypt_token(data["oauth_refresh_token"])
                 if "oauth_expires_at" in data:
-                    settings.oauth_expires_at = data["oauth_expires_at"]
+                    settings.oauth_expires_at = _parse_expires_at(data["oauth_expires_at"])
                 # 公网访问地址
                 if "public_base_url" in data:
                     settings.public_base_url = data["public_base_url"]
@@ -179,6 +205,15 @@ def load_settings() -> AppSettings:
         except Exception as _e:
             logger.warning("读取应用配置文件失败: %s", _e)
 
+    _app_config_cache = (cache_key, settings.model_copy())
+    return settings
+
+
+def load_settings() -> AppSettings:
+    """加载配置"""
+    # 首先从 ~/.iflow2api/config.json 加载所有设置（包括 api_key）
+    settings = _load_app_config()
+
     # 如果 api_key 为空，尝试从 ~/.iflow/settings.json 加载
     if not settings.api_key:
         try:
@@ -194,7 +229,7 @@ def load_settings() -> AppSettings:
             if iflow_config.oauth_refresh_token:
                 settings.oauth_refresh_token = iflow_config.oauth_refresh_token
             if iflow_config.oauth_expires_at:
-                settings.oauth_expires_at = iflow_config.oauth_expires_at.isoformat()
+                settings.oauth_expires_at = iflow_config.oauth_expires_at.timestamp()
         except (FileNotFoundError, ValueError):
             pass  # 首次运行剪未登录时正常
         except Exception as _e:
@@ -210,6 +245,8 @@ def save_settings(settings: AppSettings) -> None:
     所有设置都保存到 ~/.iflow2api/config.json
     同时也保存到 ~/.iflow/settings.json 以保持兼容性
     """
+    global _app_config_cache
+
     # 1. 保存所有设置到 ~/.iflow2api/config.json
     config_dir = get_config_dir()
     config_dir.mkdir(parents=True, exist_ok=True)
@@ -250,6 +287,7 @@ def save_settings(settings: AppSettings) -> None:
     config_path = get_config_path()
     with open(config_path, "w", encoding="utf-8") as f:
         json.dump(app_data, f, indent=2, ensure_ascii=False)
+    _app_config_cache = None
 
     # 2. 同时保存到 ~/.iflow/settings.json 以保持兼容性（Docker 中可能只读，忽略错误）
     try:
@@ -2,29 +2,36 @@
 
 刷新策略：
 1. apiKey刷新策略：检查 apiKey 有效日期，小于12小时自动刷新
-2. 每6小时检查一次
+2. 按过期时间计算下次检查时刻，最长每6小时检查一次
 3. 增加重试机制：服务器过载时自动重试（重试3次，每次等待15秒）
-4. 刷新失败时给出明确提示
+4. 刷新失败时给出明确提示，并按指数退避重试（1分钟起，最长每小时一次）
 """
 
 import asyncio
+import concurrent.futures
 import logging
 import threading
+import time
 import httpx
-from datetime import datetime, timedelta
-from typing import Optional, Callable, Tuple
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Callable, Tuple
 
 logger = logging.getLogger("iflow2api")
 
-from .oauth import IFlowOAuth
 from .config import load_iflow_config, save_iflow_config, IFlowConfig
 
+if TYPE_CHECKING:
+    from .oauth import IFlowOAuth
+
 
 # 刷新配置常量
 CHECK_INTERVAL_SECONDS = 6 * 60 * 60  # 每6小时检查一次
 REFRESH_BUFFER_SECONDS = 12 * 60 * 60  # 提前12小时刷新
 RETRY_COUNT = 3  # 重试次数
 RETRY_DELAY_SECONDS = 15  # 重试间隔
+BACKOFF_BASE_SECONDS = 60  # 刷新失败后的首次退避时间
+BACKOFF_MAX_SECONDS = 60 * 60  # 退避时间上限
 
 
 class OAuthTokenRefresher:
@@ -53,12 +60,29 @@ class OAuthTokenRefresher:
         self._running = False
         self._thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
+        # 唤醒事件：配置变更或停止时打断等待，立即重新计算下次检查时刻
+        self._wake = threading.Event()
+        # 下次检查的时间（Unix 秒）
+        self._next_check: Optional[float] = None
+        # 在此时刻（Unix 秒）之前 token 无需刷新，should_refresh_now 的快速路径
+        self._refresh_after = 0.0
         self._on_refresh_callback: Optional[Callable] = None
         # 保存主事件循环引用，用于在后台线程中提交 coroutine（M-05 修复）
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 没有主循环时由刷新器自行创建并在独立线程中运行的事件循环
+        self._loop_thread: Optional[threading.Thread] = None
+        self._owns_loop = False
+        # 持久复用的 OAuth 客户端，保留到 OAuth 服务器的 HTTP 长连接
+        self._oauth: Optional["IFlowOAuth"] = None
+        # 进行中的刷新任务；锁只保护检查与赋值，不跨 await 持有
+        self._refresh_lock = threading.Lock()
+        self._in_flight: Optional[asyncio.Future] = None
         # 上次刷新失败的时间，用于避免频繁重试
         self._last_failure_time: Optional[datetime] = None
         self._failure_count = 0
+        # 失败退避：每次失败翻倍，成功后清零；在 _retry_at（Unix 秒）之前不再发起刷新
+        self._backoff = 0.0
+        self._retry_at = 0.0
 
     def set_refresh_callback(self, callback: Callable[[dict], None]):
         """
@@ -74,14 +98,22 @@ class OAuthTokenRefresher:
         if self._running:
             return
 
-        # 在 FastAPI lifespan（asyncio 上下文）中调用时捕获当前循环
+        # 在 FastAPI lifespan（asyncio 上下文）中调用时捕获当前循环；
+        # 不在运行中的循环内调用时，启动一个长期运行的专用循环，
+        # 所有刷新都在同一循环上执行，OAuth 客户端的连接得以复用
         try:
-            self._loop = asyncio.get_event_loop()
+            self._loop = asyncio.get_running_loop()
         except RuntimeError:
-            self._loop = None
+            self._loop = asyncio.new_event_loop()
+            self._owns_loop = True
+            self._loop_thread = threading.Thread(
+                target=self._loop.run_forever, name="iflow2api-refresher-loop", daemon=True
+            )
+            self._loop_thread.start()
 
         self._running = True
         self._stop_event.clear()
+        self._wake.clear()
         self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
         logger.info("OAuth token 刷新器已启动，检查间隔: %d小时", self.check_interval // 3600)
@@ -93,16 +125,68 @@ class OAuthTokenRefresher:
 
         self._running = False
         self._stop_event.set()
+        self._wake.set()
 
         if self._thread:
             self._thread.join(timeout=5.0)
             self._thread = None
 
+        self._shutdown_loop()
         logger.info("OAuth token 刷新器已停止")
 
+    def _shutdown_loop(self):
+        """关闭 OAuth 客户端；专用循环一并停止并关闭"""
+        loop, self._loop = self._loop, None
+        oauth, self._oauth = self._oauth, None
+        if loop is None or loop.is_closed():
+            return
+
+        if self._owns_loop:
+            if oauth is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(oauth.close(), loop).result(timeout=5)
+                except Exception as e:
+                    logger.debug("关闭 OAuth 客户端失败: %s", e)
+            loop.call_soon_threadsafe(loop.stop)
+            if self._loop_thread:
+                self._loop_thread.join(timeout=5.0)
+                if not self._loop_thread.is_alive():
+                    loop.close()
+                self._loop_thread = None
+            self._owns_loop = False
+        elif oauth is not None and loop.is_running():
+            # 主循环：lifespan 关闭阶段在循环线程内同步调用 stop()，不能阻塞等待
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                loop.create_task(oauth.close())
+            else:
+                asyncio.run_coroutine_threadsafe(oauth.close(), loop)
+
+    def kick(self):
+        """唤醒刷新循环，按最新的过期时间立即重新安排下次检查
+
+        OAuth 登录完成、新 token 落盘后调用，刷新循环无需等满当前的等待时长。
+        """
+        self._refresh_after = 0.0
+        self._wake.set()
+
+    def notify_settings_changed(self):
+        """通知刷新器配置已变更，立即重新计算下次检查时刻"""
+        self.kick()
+
     def _run_loop(self):
-        """运行刷新循环（在后台线程中）"""
+        """运行刷新循环（在后台线程中）
+
+        按 token 过期时间计算等待时长，只在需要刷新时醒来，
+        最长等待 check_interval；配置变更时由 notify_settings_changed 提前唤醒。
+        """
         while not self._stop_event.is_set():
+            # 读取配置前清除唤醒标志：本轮读取之后到达的 kick() 会让下面的 wait 立即返回，不会丢失
+            self._wake.clear()
+            delay = self.check_interval
             try:
                 config = load_iflow_config()
 
@@ -110,13 +194,38 @@ class OAuthTokenRefresher:
                 if config.auth_type == "oauth-iflow":
                     # 检查 apiKey 是否需要刷新
                     if self._should_refresh(config):
-                        logger.info("apiKey 即将过期，开始刷新...")
-                        self._schedule_refresh(config)
+                        wait = self._retry_at - time.time()
+                        if wait > 0:
+                            # 上次刷新失败，退避期内不再请求
+                            delay = wait
+                        else:
+                            logger.info("apiKey 即将过期，开始刷新...")
+                            self._schedule_refresh(config)
+                    else:
+                        delay = self._seconds_until_refresh(config)
+
+            except Exception:
+                logger.exception("检查 token 状态时出错")
+
+            self._next_check = time.time() + delay
+            self._wake.wait(delay)
+
+    def _seconds_until_refresh(self, config: IFlowConfig) -> float:
+        """
+        计算距离需要刷新还有多少秒
 
-            except Exception as e:
-                logger.warning("检查 token 状态时出错: %s", e)
+        Args:
+            config: 当前 iFlow 配置
+
+        Returns:
+            等待秒数，范围为 [1, check_interval]
+        """
+        expires_at = config.api_key_expires_at or config.oauth_expires_at
+        if not config.oauth_refresh_token or not expires_at:
+            return self.check_interval
 
-            self._stop_event.wait(self.check_interval)
+        delay = expires_at.timestamp() - time.time() - self.refresh_buffer
+        return min(max(delay, 1.0), self.check_interval)
 
     def _should_refresh(self, config: IFlowConfig) -> bool:
         """
@@ -141,18 +250,17 @@ class OAuthTokenRefresher:
         if not expires_at:
             return False
 
-        # 计算距离过期的时间
-        now = datetime.now()
-        time_until_expiry = expires_at - now
+        # 计算距离过期的秒数（Unix 秒直接相减，无需构造 timedelta）
+        seconds_until_expiry = expires_at.timestamp() - time.time()
 
         # 如果已经过期，需要刷新
-        if time_until_expiry.total_seconds() <= 0:
+        if seconds_until_expiry <= 0:
             logger.info("apiKey 已过期，需要刷新")
             return True
 
         # 如果距离过期时间小于缓冲时间，需要刷新
-        if time_until_expiry.total_seconds() < self.refresh_buffer:
-            hours_until_expiry = time_until_expiry.total_seconds() / 3600
+        if seconds_until_expiry < self.refresh_buffer:
+            hours_until_expiry = seconds_until_expiry / 3600
             logger.info(
                 "apiKey 将在 %.1f 小时后过期，需要刷新",
                 hours_until_expiry
@@ -165,26 +273,91 @@ class OAuthTokenRefresher:
         """
         安排 token 刷新任务（M-05 修复）
 
-        优先使用 run_coroutine_threadsafe 注入主事件循环，
-        避免在主进程中重复创建事件循环引发资源冲突。
-        如果没有可用的主循环，则回退到 asyncio.run()。
+        使用 run_coroutine_threadsafe 注入主事件循环（或刷新器的专用循环），
+        避免每次刷新都创建、销毁事件循环。
         """
-        coro = self._refresh_token_with_retry(config)
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            # 主循环已停止（应用正在退出），OAuth 客户端绑定在该循环上，不再刷新
+            logger.warning("事件循环未运行，跳过本次 token 刷新")
+            return
 
-        if self._loop and self._loop.is_running():
-            # 在主事件循环中运行，避免创建新循环
-            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
-            try:
-                future.result(timeout=60)  # 最多等待 60 秒
-            except Exception as e:
-                logger.error("Token 刷新失败: %s", e)
-        else:
-            # 回退：创建临时隔离事件循环（仅后台线程使用）
-            asyncio.run(coro)
+        # 不阻塞等待结果，后台线程可立即响应停止信号
+        future = asyncio.run_coroutine_threadsafe(self._refresh_token_with_retry(config), loop)
+        future.add_done_callback(self._log_refresh_failure)
+
+    def _log_refresh_failure(self, future: concurrent.futures.Future) -> None:
+        """记录刷新任务的异常，并进入退避"""
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Token 刷新失败", exc_info=exc)
+            self._record_failure()
+
+    def _record_failure(self) -> None:
+        """记录一次刷新失败：退避时间翻倍（有上限），并唤醒刷新循环按退避时间重新等待"""
+        self._failure_count += 1
+        self._last_failure_time = datetime.now()
+        self._backoff = min(max(self._backoff * 2, BACKOFF_BASE_SECONDS), BACKOFF_MAX_SECONDS)
+        self._retry_at = time.time() + self._backoff
+        self._wake.set()
+
+    def _get_oauth(self) -> "IFlowOAuth":
+        """获取持久复用的 OAuth 客户端（在刷新所用的事件循环内调用）"""
+        if self._oauth is None:
+            # 按需导入，未启用 OAuth 刷新时不加载 oauth 模块
+            from .oauth import IFlowOAuth
+
+            self._oauth = IFlowOAuth()
+        return self._oauth
 
     async def _refresh_token_with_retry(self, config: IFlowConfig) -> bool:
         """
-        带重试机制的 token 刷新
+        带重试机制的 token 刷新（单飞：同一时间最多一个刷新请求）
+
+        已有刷新在进行时，直接等待其结果而不是再发一次请求。
+
+        Args:
+            config: 当前 iFlow 配置
+
+        Returns:
+            True 表示刷新成功
+        """
+        with self._refresh_lock:
+            task = self._in_flight
+            if task is None or task.done():
+                task = asyncio.ensure_future(self._refresh_if_still_needed(config))
+                self._in_flight = task
+        return await asyncio.shield(task)
+
+    async def _refresh_if_still_needed(self, config: IFlowConfig) -> bool:
+        """
+        重新读取配置后再刷新：若 access token 已被他处更新且无需刷新则直接返回
+
+        Args:
+            config: 调用方看到的 iFlow 配置
+
+        Returns:
+            True 表示刷新成功（或已被他处刷新）
+        """
+        try:
+            current = load_iflow_config()
+        except (FileNotFoundError, ValueError):
+            current = None
+
+        if current is not None:
+            if current.oauth_access_token != config.oauth_access_token and not self._should_refresh(current):
+                logger.info("Token 已被其他流程刷新，跳过本次刷新")
+                return True
+            # 使用最新配置，避免拿已失效的 refresh_token 去刷新
+            config = current
+
+        return await self._do_refresh(config)
+
+    async def _do_refresh(self, config: IFlowConfig) -> bool:
+        """
+        执行带重试的刷新请求
 
         Args:
             config: 当前 iFlow 配置
@@ -196,7 +369,7 @@ class OAuthTokenRefresher:
             logger.error("没有 refresh_token，无法刷新")
             return False
 
-        oauth = IFlowOAuth()
+        oauth = self._get_oauth()
         last_error = None
 
         for attempt in range(1, self.retry_count + 1):
@@ -209,20 +382,25 @@ class OAuthTokenRefresher:
 
                 token_data = await oauth.refresh_token(config.oauth_refresh_token)
 
-                # 更新配置
+                # 更新配置；apiKey 与 access_token 保持一致，重启后加载的才是新 token
                 config.oauth_access_token = token_data.get("access_token", "")
+                if config.oauth_access_token:
+                    config.api_key = config.oauth_access_token
                 if token_data.get("refresh_token"):
                     config.oauth_refresh_token = token_data["refresh_token"]
                 if token_data.get("expires_at"):
                     config.oauth_expires_at = token_data["expires_at"]
                     config.api_key_expires_at = token_data["expires_at"]
 
-                # 保存配置
+                # 保存配置，并让 should_refresh_now 按新的过期时间重新计算
                 save_iflow_config(config)
+                self._refresh_after = 0.0
 
-                # 重置失败计数
+                # 重置失败计数与退避
                 self._failure_count = 0
                 self._last_failure_time = None
+                self._backoff = 0.0
+                self._retry_at = 0.0
 
                 logger.info("Token 刷新成功！")
 
@@ -256,16 +434,16 @@ class OAuthTokenRefresher:
                         continue
                 else:
                     # 其他错误（如 invalid_grant），不需要重试
-                    logger.error("Token 刷新失败，可能需要重新登录: %s", error_msg)
+                    logger.exception("Token 刷新失败，可能需要重新登录: %s", error_msg)
                     break
 
         # 所有重试都失败
-        self._failure_count += 1
-        self._last_failure_time = datetime.now()
+        self._record_failure()
 
         logger.error(
-            "Token 刷新失败，已重试 %d 次。请手动重新登录 iflow。",
-            self.retry_count
+            "Token 刷新失败，已重试 %d 次，%d 秒后再次尝试。请手动重新登录 iflow。",
+            self.retry_count,
+            self._backoff,
         )
 
         # 调用回调通知失败
@@ -303,9 +481,18 @@ class OAuthTokenRefresher:
         Returns:
             True 表示需要立即刷新
         """
+        # 快速路径：token 仍在有效期内时不读配置、不做时间计算
+        if time.time() < self._refresh_after:
+            return False
+
         try:
             config = load_iflow_config()
-            return self._should_refresh(config)
+            if self._should_refresh(config):
+                return True
+            expires_at = config.api_key_expires_at or config.oauth_expires_at
+            if config.oauth_refresh_token and expires_at:
+                self._refresh_after = expires_at.timestamp() - self.refresh_buffer
+            return False
         except Exception:
             return False
 
@@ -333,8 +520,10 @@ class OAuthTokenRefresher:
                 "expires_at": expires_at.isoformat() if expires_at else None,
                 "time_until_expiry_seconds": time_until_expiry,
                 "needs_refresh": self._should_refresh(config) if config else False,
+                "next_check_at": datetime.fromtimestamp(self._next_check).isoformat() if self._next_check else None,
                 "failure_count": self._failure_count,
                 "last_failure_time": self._last_failure_time.isoformat() if self._last_failure_time else None,
+                "retry_backoff_seconds": self._backoff,
             }
         except Exception as e:
             return {
@@ -377,23 +566,15 @@ async def check_api_key_validity(api_key: str, base_url: str = "https://apis.ifl
         return False, f"检查失败: {str(e)}"
 
 
-# 全局刷新器实例
-_global_refresher: Optional[OAuthTokenRefresher] = None
-
-
+@lru_cache(maxsize=1)
 def get_global_refresher() -> OAuthTokenRefresher:
     """
-    获取全局 token 刷新器实例
+    获取全局 token 刷新器实例（首次调用时创建并缓存）
 
     Returns:
         OAuthTokenRefresher 实例
     """
-    global _global_refresher
-
-    if _global_refresher is None:
-        _global_refresher = OAuthTokenRefresher()
-
-    return _global_refresher
+    return OAuthTokenRefresher()
 
 
 def start_global_refresher():
@@ -404,8 +585,6 @@ def start_global_refresher():
 
 def stop_global_refresher():
     """停止全局 token 刷新器"""
-    global _global_refresher
-
-    if _global_refresher:
-        _global_refresher.stop()
-        _global_refresher = None
+    if get_global_refresher.cache_info().currsize:
+        get_global_refresher().stop()
+        get_global_refresher.cache_clear()
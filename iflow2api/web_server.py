@@ -1,25 +1,163 @@
 """OAuth 回调服务器 - 处理 OAuth 授权回调"""
 
+import html
 import socket
+import sys
 import threading
 import time
 import urllib.parse
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from typing import Optional, Callable, Dict, Any
 
 
+# 回调页面在导入时预先编码为 bytes，请求处理中无需拼接字符串和编码
+_SUCCESS_HTML_STR = """\
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>登录成功</title>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 100vh;
+            margin: 0;
+            background-color: #f5f5f5;
+        }
+        .container {
+            text-align: center;
+            padding: 40px;
+            background: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        .icon {
+            font-size: 64px;
+            color: #4CAF50;
+            margin-bottom: 20px;
+        }
+        h1 {
+            color: #333;
+            margin-bottom: 10px;
+        }
+        p {
+            color: #666;
+            margin-bottom: 20px;
+        }
+        .hint {
+            font-size: 14px;
+            color: #999;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="icon">✓</div>
+        <h1>登录成功！</h1>
+        <p>您可以关闭此页面并返回应用程序。</p>
+        <p class="hint">此页面将在 5 秒后自动关闭...</p>
+        <script>
+            setTimeout(function() {
+                window.close();
+            }, 5000);
+        </script>
+    </div>
+</body>
+</html>
+"""
+
+_ERROR_HTML_STR = """\
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>登录失败</title>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 100vh;
+            margin: 0;
+            background-color: #f5f5f5;
+        }
+        .container {
+            text-align: center;
+            padding: 40px;
+            background: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        .icon {
+            font-size: 64px;
+            color: #f44336;
+            margin-bottom: 20px;
+        }
+        h1 {
+            color: #333;
+            margin-bottom: 10px;
+        }
+        p {
+            color: #666;
+            margin-bottom: 20px;
+        }
+        .error {
+            color: #f44336;
+            font-weight: bold;
+            margin-bottom: 20px;
+        }
+        .hint {
+            font-size: 14px;
+            color: #999;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="icon">✕</div>
+        <h1>登录失败</h1>
+        <p class="error">{error_message}</p>
+        <p>请重试或联系技术支持。</p>
+        <p class="hint">此页面将在 5 秒后自动关闭...</p>
+        <script>
+            setTimeout(function() {
+                window.close();
+            }, 5000);
+        </script>
+    </div>
+</body>
+</html>
+"""
+
+_SUCCESS_HTML = _SUCCESS_HTML_STR.encode("utf-8")
+_SUCCESS_HTML_LENGTH = str(len(_SUCCESS_HTML))
+_ERROR_HTML_PREFIX, _ERROR_HTML_SUFFIX = (
+    part.encode("utf-8") for part in _ERROR_HTML_STR.split("{error_message}")
+)
+
+
 class OAuthCallbackHandler(BaseHTTPRequestHandler):
     """OAuth 回调请求处理器
 
     回调数据通过实例引用共享的 server 对象（H-06 修复：不再使用类变量，消除并发竞态）
     """
 
+    # 回调响应很小，关闭 Nagle 算法避免约 40ms 的发送延迟
+    disable_nagle_algorithm = True
+
     def log_message(self, format: str, *args: Any) -> None:
         """禁用默认日志输出"""
         pass
 
     def do_GET(self) -> None:
         """处理 GET 请求"""
+        # 收到请求的时刻，用于计算从启动到回调的耗时
+        received_t_ns = time.monotonic_ns()
+
         # 解析查询参数
         parsed = urllib.parse.urlparse(self.path)
         query = urllib.parse.parse_qs(parsed.query)
@@ -29,152 +167,51 @@ class OAuthCallbackHandler(BaseHTTPRequestHandler):
         error = query.get("error", [None])[0]
         state = query.get("state", [None])[0]
 
-        # 将数据写入 server 实例，而非类变量
-        self.server.callback_code = code      # type: ignore[attr-defined]
-        self.server.callback_error = error    # type: ignore[attr-defined]
-        self.server.callback_state = state    # type: ignore[attr-defined]
-
         # 返回响应
         if code:
             self._send_success_response()
         else:
             self._send_error_response(error or "授权失败")
 
+        # 将数据写入 server 实例，而非类变量；只有第一个真正的回调（带 code 或 error）才被记录，
+        # 浏览器的 favicon 等附带请求不会覆盖已收到的回调
+        server = self.server
+        if (code is not None or error is not None) and not server.callback_event.is_set():  # type: ignore[attr-defined]
+            # 一次赋值写入全部回调数据，等待方读到的总是同一次回调的完整结果
+            server.callback_result = (code, error, state, received_t_ns)  # type: ignore[attr-defined]
+            server.callback_event.set()  # type: ignore[attr-defined]
+            # 收到回调后立即关闭服务器，不再接受新连接；
+            # shutdown() 会等待 serve_forever 退出，须在其他线程中调用
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
     def _send_success_response(self) -> None:
         """发送成功响应"""
         self.send_response(200)
         self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", _SUCCESS_HTML_LENGTH)
         self.end_headers()
-
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>登录成功</title>
-            <style>
-                body {
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    height: 100vh;
-                    margin: 0;
-                    background-color: #f5f5f5;
-                }
-                .container {
-                    text-align: center;
-                    padding: 40px;
-                    background: white;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                }
-                .icon {
-                    font-size: 64px;
-                    color: #4CAF50;
-                    margin-bottom: 20px;
-                }
-                h1 {
-                    color: #333;
-                    margin-bottom: 10px;
-                }
-                p {
-                    color: #666;
-                    margin-bottom: 20px;
-                }
-                .hint {
-                    font-size: 14px;
-                    color: #999;
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="icon">✓</div>
-                <h1>登录成功！</h1>
-                <p>您可以关闭此页面并返回应用程序。</p>
-                <p class="hint">此页面将在 5 秒后自动关闭...</p>
-                <script>
-                    setTimeout(function() {
-                        window.close();
-                    }, 5000);
-                </script>
-            </div>
-        </body>
-        </html>
-        """
-        self.wfile.write(html.encode("utf-8"))
+        self.wfile.write(_SUCCESS_HTML)
 
     def _send_error_response(self, error_message: str) -> None:
         """发送错误响应"""
+        # error_message 来自回调 URL 查询参数，必须转义防止反射型 XSS
+        message = html.escape(error_message).encode("utf-8", "replace")
+        # 拼成一个缓冲区一次写出：关闭 Nagle 后每次 write 都是单独的 TCP 报文
+        body = _ERROR_HTML_PREFIX + message + _ERROR_HTML_SUFFIX
         self.send_response(400)
         self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
+        self.wfile.write(body)
 
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>登录失败</title>
-            <style>
-                body {{
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    height: 100vh;
-                    margin: 0;
-                    background-color: #f5f5f5;
-                }}
-                .container {{
-                    text-align: center;
-                    padding: 40px;
-                    background: white;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                }}
-                .icon {{
-                    font-size: 64px;
-                    color: #f44336;
-                    margin-bottom: 20px;
-                }}
-                h1 {{
-                    color: #333;
-                    margin-bottom: 10px;
-                }}
-                p {{
-                    color: #666;
-                    margin-bottom: 20px;
-                }}
-                .error {{
-                    color: #f44336;
-                    font-weight: bold;
-                    margin-bottom: 20px;
-                }}
-                .hint {{
-                    font-size: 14px;
-                    color: #999;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="icon">✕</div>
-                <h1>登录失败</h1>
-                <p class="error">{error_message}</p>
-                <p>请重试或联系技术支持。</p>
-                <p class="hint">此页面将在 5 秒后自动关闭...</p>
-                <script>
-                    setTimeout(function() {{
-                        window.close();
-                    }}, 5000);
-                </script>
-            </div>
-        </body>
-        </html>
-        """
-        self.wfile.write(html.encode("utf-8"))
+
+class _CallbackHTTPServer(ThreadingHTTPServer):
+    """多线程回调服务器：浏览器的预连接或 favicon 请求不会阻塞真正的回调"""
+
+    # 避免 TIME_WAIT 导致重启登录时绑定失败；
+    # Windows 上 SO_REUSEADDR 允许抢占已绑定端口，因此不设置
+    allow_reuse_address = sys.platform != "win32"
+    daemon_threads = True
 
 
 class OAuthCallbackServer:
@@ -190,7 +227,7 @@ class OAuthCallbackServer:
         """
         self.host = host
         self.port = port
-        self._server: Optional[HTTPServer] = None
+        self._server: Optional[_CallbackHTTPServer] = None
         self._thread: Optional[threading.Thread] = None
         self._running = False
 
@@ -223,17 +260,13 @@ class OAuthCallbackServer:
         if self._running:
             return True
 
-        # 检查端口是否可用
-        if not self.is_port_available():
-            return False
-
         try:
-            # 创建服务器
-            self._server = HTTPServer((self.host, self.port), OAuthCallbackHandler)
+            # 创建服务器，直接绑定端口（不再预先探测，避免探测与绑定之间的竞态）
+            self._server = _CallbackHTTPServer((self.host, self.port), OAuthCallbackHandler)
             # 实例级回调数据（H-06 修复：不再使用类变量）
-            self._server.callback_code = None   # type: ignore[attr-defined]
-            self._server.callback_error = None  # type: ignore[attr-defined]
-            self._server.callback_state = None  # type: ignore[attr-defined]
+            self._server.callback_result = None  # type: ignore[attr-defined]
+            self._server.start_t_ns = time.monotonic_ns()  # type: ignore[attr-defined]
+            self._server.callback_event = threading.Event()  # type: ignore[attr-defined]
 
             # 启动服务器线程
             self._thread = threading.Thread(target=self._run_server, daemon=True)
@@ -242,6 +275,10 @@ class OAuthCallbackServer:
             self._running = True
             return True
         except Exception:
+            # 端口被占用时绑定抛出 OSError
+            if self._server:
+                self._server.server_close()
+                self._server = None
             return False
 
     def _run_server(self) -> None:
@@ -252,12 +289,20 @@ class OAuthCallbackServer:
     def stop(self) -> None:
         """停止 OAuth 回调服务器"""
         if self._server and self._running:
+            self._running = False
+            # 先关闭监听 socket，让 serve_forever 的 select 立即返回，
+            # shutdown() 无需等满一个 poll_interval
+            try:
+                self._server.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self._server.shutdown()
             self._server.server_close()
-            self._running = False
+            # 唤醒仍在等待回调的线程
+            self._server.callback_event.set()  # type: ignore[attr-defined]
 
         if self._thread:
-            self._thread.join(timeout=2.0)
+            self._thread.join(timeout=0.5)
             self._thread = None
 
         self._server = None
@@ -266,7 +311,7 @@ class OAuthCallbackServer:
         self,
         timeout: int = 60,
         callback: Optional[Callable[[Optional[str], Optional[str]], None]] = None,
-    ) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    ) -> tuple[Optional[str], Optional[str], Optional[str], Optional[float]]:
         """
         等待 OAuth 回调
 
@@ -275,27 +320,35 @@ class OAuthCallbackServer:
             callback: 回调函数，接收 (code, error) 参数
 
         Returns:
-            (auth_code, error, state) 三元组，state 供调用方做 CSRF 校验
+            (auth_code, error, state, latency_ms) 四元组，state 供调用方做 CSRF 校验，
+            latency_ms 为服务器启动到收到回调的耗时（毫秒），超时或服务器停止时为 None
         """
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            if not self._server:
-                return None, "server_stopped", None
-            code = self._server.callback_code    # type: ignore[attr-defined]
-            error = self._server.callback_error  # type: ignore[attr-defined]
-            state = self._server.callback_state  # type: ignore[attr-defined]
-            if code is not None or error is not None:
-                if callback:
-                    callback(code, error)
-                return code, error, state
-            time.sleep(0.1)
-
-        # 超时
+        server = self._server
+        if not server:
+            return None, "server_stopped", None, None
+
+        # 阻塞等待处理器通知，无需轮询
+        if not server.callback_event.wait(timeout):  # type: ignore[attr-defined]
+            # 超时
+            if callback:
+                callback(None, "timeout")
+            return None, "timeout", None, None
+
+        # 处理器收到回调后已请求关闭服务器，等待服务线程退出
+        thread = self._thread
+        if thread:
+            thread.join(timeout=1.0)
+
+        result = server.callback_result  # type: ignore[attr-defined]
+        if result is None:
+            # 被 stop() 唤醒
+            return None, "server_stopped", None, None
+
+        code, error, state, callback_t_ns = result
+        latency_ms = (callback_t_ns - server.start_t_ns) / 1e6  # type: ignore[attr-defined]
         if callback:
-            callback(None, "timeout")
-
-        return None, "timeout", None
+            callback(code, error)
+        return code, error, state, latency_ms
 
     def get_callback_url(self) -> str:
         """
@@ -329,12 +382,16 @@ def find_available_port(
     Returns:
         可用端口号，如果找不到则返回 None
     """
-    for port in range(start_port, start_port + max_attempts):
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+    # 复用同一个 socket 依次尝试绑定：绑定失败的 socket 仍处于未绑定状态，可继续尝试
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # 与回调服务器保持一致，TIME_WAIT 状态的端口视为可用
+        if _CallbackHTTPServer.allow_reuse_address:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        for port in range(start_port, start_port + max_attempts):
+            try:
                 s.bind(("localhost", port))
                 return port
-        except OSError:
-            continue
+            except OSError:
+                continue
 
     return None